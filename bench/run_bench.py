@@ -0,0 +1,395 @@
+"""Benchmarks the editor's hot paths headless and compares runs.
+
+    python bench/run_bench.py run --sizes 1K,1M,10M --output results.json
+    python bench/run_bench.py run --sizes full --compare results.json
+    python bench/run_bench.py compare old.json new.json
+
+Each operation runs in a fresh process under Qt's offscreen platform, so peak
+RSS is per operation. The operations go through the real Notebook handlers,
+with file dialogs answered automatically. Event-loop stalls are measured with
+the same heartbeat as the in-app "Log Slow Handlers" option.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+
+OPERATIONS = ("open_file", "save_file", "auto_save", "find_text", "export_to_pdf", "apply_css")
+DEFAULT_SIZES = "1K,100K,1M,10M"
+SIZE_PRESETS = {"full": "1K,100K,1M,10M,100M,500M"}
+SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+DEFAULT_TIMEOUT = 300  # Seconds per operation
+
+NEEDLE = "notebook"
+WORDS = (
+    "the of and to in is was for on that with as by at from this it an be are or not have which "
+    "but they all were when we there can been has more if will one would so what up out about into "
+    "than them only could new time some these two may first then do any like my now over such our "
+    "man me even most made after also did many before must through back years where much your way "
+    f"well down should because each just those people how too little state good very make world {NEEDLE}"
+).split()
+
+# Noise floors below which a difference is not reported as a regression
+NOISE = {"wall_s": 0.005, "peak_rss_mb": 5.0, "max_stall_ms": 10.0}
+
+
+def parse_size(text):
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+
+def format_size(size):
+    for unit in ("G", "M", "K"):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}"
+    return str(size)
+
+
+def generate_note(path, size):
+    """Writes a note of exactly size bytes made of numbered pseudo-random lines."""
+    rng = random.Random(size)
+    pool = [" ".join(rng.choices(WORDS, k=rng.randint(5, 16))).capitalize() + "." for _ in range(4096)]
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8", newline="") as file:
+        written = file.write(f"Title: Benchmark {format_size(size)}\nTags: bench\nDate: 2025-01-01\n\n")
+        number = 0
+        while written < size:
+            lines = []
+            for _ in range(10000):
+                number += 1
+                lines.append(f"{number} {pool[rng.randrange(4096)]}\n")
+            written += file.write("".join(lines))
+        file.truncate(size)  # ASCII only, so bytes and characters match
+    os.replace(temp_path, path)
+    return path
+
+
+def ensure_note(data_dir, size):
+    path = os.path.join(data_dir, f"note-{format_size(size)}.txt")
+    if not os.path.exists(path) or os.path.getsize(path) != size:
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"Generating {format_size(size)} note...", file=sys.stderr)
+        generate_note(path, size)
+    return path
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # Children covers the PDF export process; ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak * scale / 1024 ** 2, 1)
+
+
+def run_operation(operation, note_path, timeout):
+    """Runs one operation in this process and returns its measurements."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    sys.path.insert(0, SRC_DIR)
+    import logging
+
+    from PyQt5.QtCore import QEventLoop, QSettings, QTimer
+    from PyQt5.QtWidgets import QApplication
+
+    import main
+    from profiling import STALL_THRESHOLD, StallMonitor
+
+    logging.basicConfig(format="%(name)s: %(message)s")
+    workdir = tempfile.mkdtemp(prefix="notebook-bench-")
+    errors = []
+    # Work on a copy: auto_save writes to the note, and generated notes are reused
+    note_path = shutil.copyfile(note_path, os.path.join(workdir, os.path.basename(note_path)))
+
+    # Keep the user's settings, session and history out of the benchmark
+    for settings_format in (QSettings.NativeFormat, QSettings.IniFormat):
+        QSettings.setPath(settings_format, QSettings.UserScope, workdir)
+    settings = QSettings("MyCompany", "NotebookApp")
+    settings.setValue("history_db", os.path.join(workdir, "history.sqlite3"))
+    settings.setValue("notes_dir", os.path.join(workdir, "notes"))
+    settings.sync()
+
+    # Answer dialogs instead of blocking on them
+    main.QFileDialog.getOpenFileName = staticmethod(lambda *args, **kwargs: (note_path, ""))
+    main.QFileDialog.getSaveFileName = staticmethod(
+        lambda parent, caption, *args, **kwargs: (os.path.join(
+            workdir, "export.pdf" if "PDF" in caption else "saved.txt"), ""))
+    main.QMessageBox.critical = staticmethod(lambda parent, title, text: errors.append(text))
+    main.QMessageBox.information = staticmethod(lambda parent, title, text: errors.append(text))
+
+    app = QApplication([])
+    window = main.Notebook()
+    window.show()
+
+    def run_until(predicate, seconds):
+        if predicate():
+            return True
+        loop = QEventLoop()
+        poll = QTimer()
+        poll.timeout.connect(lambda: predicate() and loop.quit())
+        poll.start(5)
+        QTimer.singleShot(int(seconds * 1000), loop.quit)
+        loop.exec_()
+        poll.stop()
+        return predicate()
+
+    def open_note():
+        window.open_path(note_path)
+        editor = window.current_editor()
+        run_until(lambda: not editor.is_loading(), timeout)
+        return editor
+
+    done = None
+    if operation == "open_file":
+        tabs = window.tabs.count()
+        action = window.open_file
+        done = lambda: window.tabs.count() > tabs and not window.current_editor().is_loading()
+    elif operation == "save_file":
+        open_note()
+        action = window.save_file
+    elif operation == "auto_save":
+        editor = open_note()
+        cursor = main.QTextCursor(editor.document().findBlockByNumber(editor.document().blockCount() // 2))
+        cursor.insertText("An edited line for the auto-save benchmark.\n")
+        action = window.auto_save_all
+        done = lambda: window.writer.queue.unfinished_tasks == 0
+    elif operation == "find_text":
+        open_note()
+        window.find_bar.query_edit.setText(NEEDLE)
+        window.find_bar.research_timer.stop()
+        action = window.find_text
+        done = lambda: window.find_bar.worker is None
+    elif operation == "export_to_pdf":
+        open_note()
+        action = window.export_to_pdf
+        done = lambda: not window.findChildren(main.PdfExportJob)
+    elif operation == "apply_css":
+        open_note()
+        action = window.toggle_theme
+    else:
+        raise ValueError(f"Unknown operation: {operation}")
+    run_until(lambda: False, 0.2)  # Let setup relayouts finish before measuring
+
+    monitor = StallMonitor(threshold=STALL_THRESHOLD)
+    timing = {}
+
+    def start():
+        monitor.reset()
+        timing["start"] = time.perf_counter()
+        action()
+        timing["returned"] = time.perf_counter()
+
+    baseline_rss = peak_rss_mb()
+    monitor.set_enabled(True)
+    QTimer.singleShot(0, start)
+    finished = run_until(lambda: "returned" in timing and (done is None or done()), timeout)
+    end = timing["returned"] if done is None and finished else time.perf_counter()
+    # A few on-time heartbeats make sure trailing relayouts are counted as stalls
+    beats = monitor.beats
+    run_until(lambda: monitor.beats >= beats + 3, 5)
+    monitor.set_enabled(False)
+
+    result = {
+        "status": "ok" if finished and not errors else ("timeout" if not finished else "error"),
+        "wall_s": round(end - timing.get("start", end), 4),
+        "peak_rss_mb": peak_rss_mb(),
+        "baseline_rss_mb": baseline_rss,
+        "max_stall_ms": round(monitor.max_stall * 1000, 1),
+        "stalled_ms": round(monitor.total_stall * 1000, 1),
+        "stalls": monitor.stalls,
+    }
+    if errors:
+        result["error"] = errors[0]
+    window.close()  # Also stops a PDF export left running by a timeout
+    app.processEvents()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def run_worker(operation, note_path, timeout, verbose=False):
+    command = [sys.executable, os.path.abspath(__file__), "worker", operation, note_path, "--timeout", str(timeout)]
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    # A new session lets a hung worker be killed together with its PDF export process
+    process = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                               start_new_session=True)
+    try:
+        # The worker's own timeout cannot interrupt a call that never returns to the event loop
+        stdout, stderr = process.communicate(timeout=2 * timeout + 60)
+    except subprocess.TimeoutExpired:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+        process.communicate()
+        return {"status": "timeout"}
+    if verbose and stderr:
+        print(stderr, end="", file=sys.stderr)
+    try:
+        return json.loads(stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        message = (stderr.strip().splitlines() or [f"exit code {process.returncode}"])[-1]
+        return {"status": "error", "error": message}
+
+
+def summarize(runs):
+    """Merges repeated runs: median times, highest memory."""
+    ok = [run for run in runs if run["status"] == "ok"]
+    if not ok:
+        return runs[-1]
+    summary = {"status": "ok"}
+    for key in ("wall_s", "max_stall_ms", "stalled_ms"):
+        summary[key] = round(statistics.median(run[key] for run in ok), 4)
+    for key in ("peak_rss_mb", "baseline_rss_mb", "stalls"):
+        values = [run[key] for run in ok if run.get(key) is not None]
+        summary[key] = max(values) if values else None
+    return summary
+
+
+def cmd_run(args):
+    sizes = [parse_size(size) for size in SIZE_PRESETS.get(args.sizes, args.sizes).split(",")]
+    operations = args.ops.split(",") if args.ops else list(OPERATIONS)
+    for operation in operations:
+        if operation not in OPERATIONS:
+            raise SystemExit(f"Unknown operation {operation!r}; choose from {', '.join(OPERATIONS)}")
+
+    from PyQt5.QtCore import PYQT_VERSION_STR, QT_VERSION_STR
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "cpus": os.cpu_count(),
+        },
+        "repeat": args.repeat,
+        "results": [],
+    }
+    for size in sizes:
+        note_path = ensure_note(args.data_dir, size)
+        open_timed_out = False
+        for operation in operations:
+            if open_timed_out:
+                # Every other operation opens the note first, so it would only time out again
+                runs = [{"status": "skipped", "error": "open_file timed out"}]
+            else:
+                runs = [run_worker(operation, note_path, args.timeout, args.verbose) for _ in range(args.repeat)]
+            result = {"operation": operation, "size": format_size(size), "bytes": size, **summarize(runs)}
+            open_timed_out = open_timed_out or (operation == "open_file" and result["status"] == "timeout")
+            report["results"].append(result)
+            print(format_result(result), file=sys.stderr)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+    if args.compare:
+        return compare_reports(load_report(args.compare), report, args.tolerance)
+    return 0
+
+
+def format_result(result):
+    if result["status"] != "ok":
+        error = f": {result['error']}" if result.get("error") else ""
+        return f"{result['operation']:<14}{result['size']:>6}  {result['status']}{error}"
+    rss = f"{result['peak_rss_mb']:.0f} MB" if result.get("peak_rss_mb") is not None else "n/a"
+    return (f"{result['operation']:<14}{result['size']:>6}  {result['wall_s'] * 1000:10.1f} ms"
+            f"  max stall {result['max_stall_ms']:8.1f} ms  peak RSS {rss:>8}")
+
+
+def load_report(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def compare_reports(old, new, tolerance):
+    """Prints metric changes between two reports; returns 1 if anything regressed."""
+    old_results = {(result["operation"], result["size"]): result for result in old["results"]}
+    regressions = 0
+    print(f"{'operation':<14}{'size':>6}  {'metric':<13}{'old':>10}{'new':>10}{'change':>9}")
+    for result in new["results"]:
+        key = (result["operation"], result["size"])
+        previous = old_results.get(key)
+        if previous is None:
+            continue
+        if result["status"] != "ok" or previous["status"] != "ok":
+            if result["status"] != previous["status"]:
+                print(f"{key[0]:<14}{key[1]:>6}  status       {previous['status']:>10}{result['status']:>10}")
+                regressions += result["status"] != "ok"
+            continue
+        for metric, floor in NOISE.items():
+            before, after = previous.get(metric), result.get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else 0.0
+            regressed = after - before > floor and change > tolerance
+            regressions += regressed
+            marker = "  REGRESSION" if regressed else ""
+            print(f"{key[0]:<14}{key[1]:>6}  {metric:<13}{before:>10.4g}{after:>10.4g}{change:>+9.0%}{marker}")
+    print(f"{regressions} regression(s) beyond {tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+def cmd_compare(args):
+    return compare_reports(load_report(args.old), load_report(args.new), args.tolerance)
+
+
+def cmd_worker(args):
+    print(json.dumps(run_operation(args.operation, args.note, args.timeout)))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="run_bench.py", description="Benchmark the notebook editor.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks and write a JSON report")
+    run.add_argument("--sizes", default=DEFAULT_SIZES,
+                     help="comma-separated note sizes such as 1K,10M, or 'full' for 1K-500M (default: %(default)s)")
+    run.add_argument("--ops", help=f"comma-separated operations (default: all of {', '.join(OPERATIONS)})")
+    run.add_argument("--repeat", "-r", type=int, default=1, help="runs per operation; medians are reported")
+    run.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="seconds per operation")
+    run.add_argument("--output", "-o", default="bench_results.json")
+    run.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "notebook-bench"),
+                     help="where generated notes are cached (default: %(default)s)")
+    run.add_argument("--compare", metavar="BASELINE", help="compare against an earlier report when done")
+    run.add_argument("--tolerance", type=float, default=0.2, help="relative change counted as a regression")
+    run.add_argument("--verbose", "-v", action="store_true", help="show each worker's log output")
+    run.set_defaults(func=cmd_run)
+
+    compare = commands.add_parser("compare", help="compare two JSON reports")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.add_argument("--tolerance", type=float, default=0.2, help="relative change counted as a regression")
+    compare.set_defaults(func=cmd_compare)
+
+    worker = commands.add_parser("worker", help="(internal) run one operation and print its measurements")
+    worker.add_argument("operation", choices=OPERATIONS)
+    worker.add_argument("note")
+    worker.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT)
+    worker.set_defaults(func=cmd_worker)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
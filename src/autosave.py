@@ -0,0 +1,240 @@
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+
+JOURNAL_SUFFIX = ".journal"
+COMPACT_AFTER_ENTRIES = 50
+COMPACT_MIN_JOURNAL_BYTES = 1024 * 1024
+SNAPSHOT_MAX_BYTES = 8 * 1024 * 1024  # Larger files are saved without recording history
+
+
+def atomic_write(path, text):
+    """Writes text to a temp file next to path and renames it into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def read_lines(path):
+    """Returns the file as a list of lines, one per editor block, with the journal replayed."""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            lines = file.read().split("\n")
+    except FileNotFoundError:
+        lines = [""]
+    try:
+        with open(path + JOURNAL_SUFFIX, "r", encoding="utf-8") as journal:
+            for entry in journal:
+                try:
+                    patch = json.loads(entry)
+                except ValueError:
+                    break  # Torn final entry from a crash mid-append
+                lines[patch["start"]:patch["end"]] = patch["lines"]
+    except FileNotFoundError:
+        pass
+    return lines
+
+
+def recover_journal(path):
+    """Folds a journal left behind by a crash back into its file."""
+    if os.path.exists(path + JOURNAL_SUFFIX):
+        atomic_write(path, "\n".join(read_lines(path)))
+        os.remove(path + JOURNAL_SUFFIX)
+
+
+class JournalWriter:
+    """Background writer that journals changed blocks and compacts them into the file.
+
+    Each patch replaces lines[start:end] of the file with new lines. Patches are
+    appended to "<path>.journal" and fsynced, which is cheap regardless of file
+    size; once the journal grows past a threshold it is compacted into the file
+    with a temp file and an atomic rename. If given, snapshot(path, text) is
+    called on the writer thread with the full text after every save of a file
+    up to snapshot_max_bytes; write_now returns before the snapshot is taken.
+
+    Patches only make sense against the exact lines the editor last saved, so
+    after a failed patch or write the path is marked stale: later patches for
+    it are dropped until a full write (submit_write or write_now) succeeds.
+    The same happens when the file is deleted or rewritten behind the writer's
+    back, which is noticed by comparing its size and mtime with the ones
+    recorded after the last write, compaction or reload.
+    """
+
+    def __init__(self, on_error=None, snapshot=None, snapshot_max_bytes=SNAPSHOT_MAX_BYTES):
+        self.on_error = on_error
+        self.snapshot = snapshot
+        self.snapshot_max_bytes = snapshot_max_bytes
+        self.queue = queue.Queue()
+        self.lines = {}
+        self.entries = {}
+        self.stale = set()
+        self.stats = {}
+        self.thread = threading.Thread(target=self.run, name="auto-save-writer", daemon=True)
+        self.thread.start()
+
+    def submit_patch(self, path, start, end, lines):
+        self.queue.put(("patch", path, (start, end, lines), None))
+
+    def submit_write(self, path, text):
+        """Queues a replacement of the whole file; failures go to on_error."""
+        self.queue.put(("write", path, text, None))
+
+    def is_stale(self, path):
+        return path in self.stale
+
+    def write_now(self, path, text):
+        """Replaces the whole file, waiting for queued patches first. Raises on failure."""
+        done = threading.Event()
+        result = {}
+        self.queue.put(("write", path, text, (done, result)))
+        done.wait()
+        if "error" in result:
+            raise result["error"]
+
+    def reload(self, path):
+        """Settles queued patches and any stale journal before path is opened again."""
+        done = threading.Event()
+        result = {}
+        self.queue.put(("reload", path, None, (done, result)))
+        done.wait()
+        if "error" in result:
+            raise result["error"]
+
+    def flush(self):
+        self.queue.put(("flush", None, None, None))
+        self.queue.join()
+
+    def close(self):
+        self.flush()
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            action, path, payload, waiter = item
+            try:
+                if action == "patch":
+                    if path not in self.stale:
+                        lines = self.apply_patch(path, *payload)
+                        if self.wants_snapshot(path):
+                            self.take_snapshot(path, "\n".join(lines))
+                elif action == "write":
+                    self.discard(path)
+                    atomic_write(path, payload)
+                    self.record_stat(path)
+                    self.stale.discard(path)
+                    if waiter is not None:
+                        waiter[0].set()  # The file is saved; don't keep write_now waiting for history
+                    if self.wants_snapshot(path):
+                        self.take_snapshot(path, payload)
+                elif action == "reload":
+                    self.compact(path)
+                    recover_journal(path)
+                    self.record_stat(path)
+                elif action == "flush":
+                    for dirty_path in list(self.lines):
+                        self.compact(dirty_path)
+            except Exception as e:
+                if action in ("patch", "write"):
+                    # The file and journal may no longer match the cached lines
+                    self.lines.pop(path, None)
+                    self.entries.pop(path, None)
+                    self.stale.add(path)
+                if waiter is not None:
+                    waiter[1]["error"] = e
+                elif self.on_error is not None:
+                    self.on_error(path or "", str(e))
+            finally:
+                if waiter is not None:
+                    waiter[0].set()
+                self.queue.task_done()
+
+    def wants_snapshot(self, path):
+        # Joining and chunking a huge file on every auto-save costs far more than its history is worth
+        return self.snapshot is not None and self.stats.get(path, (0,))[0] <= self.snapshot_max_bytes
+
+    def take_snapshot(self, path, text):
+        # The note itself is already safe on disk; a history failure must not fail the save
+        if self.snapshot is None:
+            return
+        try:
+            self.snapshot(path, text)
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(path, f"Could not record history: {e}")
+
+    def record_stat(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.stats.pop(path, None)
+            return
+        self.stats[path] = (stat.st_size, stat.st_mtime_ns)
+
+    def check_unchanged(self, path):
+        """Raises if path is gone or no longer the file this writer last left on disk."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.discard(path)
+            raise FileNotFoundError("The file was deleted; it will be written again in full") from None
+        if self.stats.get(path) != (stat.st_size, stat.st_mtime_ns):
+            # The journal was recorded against the old contents and must not be replayed onto the new ones
+            self.discard(path)
+            raise RuntimeError("The file was changed by another program; it will be overwritten with the editor's text")
+
+    def apply_patch(self, path, start, end, new_lines):
+        self.check_unchanged(path)
+        if path not in self.lines:
+            self.lines[path] = read_lines(path)
+            self.entries[path] = 0
+            # Keep the pre-edit text too, so the first auto-save can be undone from history
+            if self.wants_snapshot(path):
+                self.take_snapshot(path, "\n".join(self.lines[path]))
+        with open(path + JOURNAL_SUFFIX, "a", encoding="utf-8") as journal:
+            journal.write(json.dumps({"start": start, "end": end, "lines": new_lines}) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+            journal_size = journal.tell()
+        lines = self.lines[path]
+        lines[start:end] = new_lines
+        self.entries[path] += 1
+
+        file_size = self.stats[path][0]
+        if (self.entries[path] >= COMPACT_AFTER_ENTRIES
+                or journal_size > max(COMPACT_MIN_JOURNAL_BYTES, file_size // 4)):
+            self.compact(path)
+        return lines
+
+    def compact(self, path):
+        lines = self.lines.pop(path, None)
+        self.entries.pop(path, None)
+        if lines is None:
+            return
+        atomic_write(path, "\n".join(lines))
+        self.record_stat(path)
+        os.remove(path + JOURNAL_SUFFIX)
+
+    def discard(self, path):
+        self.lines.pop(path, None)
+        self.entries.pop(path, None)
+        if os.path.exists(path + JOURNAL_SUFFIX):
+            os.remove(path + JOURNAL_SUFFIX)
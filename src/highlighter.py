@@ -0,0 +1,258 @@
+import os
+import re
+import time
+from collections import deque
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QColor, QFont, QSyntaxHighlighter, QTextCharFormat, QTextLayout
+
+FRAME_BUDGET = 0.008  # Seconds of highlighting allowed per event-loop turn
+HEADER_LINES = 10
+
+NORMAL = 0
+PENDING = 1000  # Block not highlighted yet; never a real lexer state
+
+C_KEYWORDS = (
+    "auto break case catch char class const continue default delete do double else enum extern "
+    "final finally float for goto if implements import include inline int interface long namespace "
+    "new package private protected public return short signed sizeof static struct super switch "
+    "template this throw throws try typedef union unsigned using virtual void volatile while "
+    "bool true false null nullptr fn let mut impl trait pub use mod match func go defer chan "
+    "var val fun override"
+)
+
+LANGUAGES = {
+    "python": {
+        "keywords": (
+            "and as assert async await break class continue def del elif else except False finally "
+            "for from global if import in is lambda None nonlocal not or pass raise return True try "
+            "while with yield self"
+        ),
+        "line_comment": "#",
+        "multiline": ('"""', "'''"),
+    },
+    "javascript": {
+        "keywords": (
+            "async await break case catch class const continue debugger default delete do else "
+            "export extends false finally for from function if import in instanceof let new null "
+            "of return static super switch this throw true try typeof undefined var void while "
+            "with yield interface type enum implements"
+        ),
+        "line_comment": "//",
+        "multiline": (("/*", "*/"),),
+    },
+    "c": {
+        "keywords": C_KEYWORDS,
+        "line_comment": "//",
+        "multiline": (("/*", "*/"),),
+    },
+    "shell": {
+        "keywords": (
+            "if then else elif fi case esac for select while until do done in function time "
+            "return exit export local readonly declare echo source"
+        ),
+        "line_comment": "#",
+        "multiline": (),
+    },
+    "sql": {
+        "keywords": (
+            "select from where and or not insert into values update set delete create table drop "
+            "alter index view join left right inner outer on as group by order having limit offset "
+            "union all distinct null is in like between exists case when then else end primary key "
+            "foreign references default begin commit rollback with"
+        ),
+        "line_comment": "--",
+        "multiline": (("/*", "*/"),),
+        "ignore_case": True,
+    },
+}
+
+EXTENSIONS = {
+    ".py": "python", ".pyw": "python",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".ts": "javascript", ".tsx": "javascript",
+    ".c": "c", ".h": "c", ".cc": "c", ".cpp": "c", ".hpp": "c", ".java": "c", ".cs": "c",
+    ".go": "c", ".rs": "c", ".kt": "c", ".swift": "c",
+    ".sh": "shell", ".bash": "shell", ".zsh": "shell",
+    ".sql": "sql",
+}
+
+ALIASES = {
+    "py": "python", "python3": "python", "js": "javascript", "node": "javascript", "ts": "javascript",
+    "typescript": "javascript", "cpp": "c", "c++": "c", "java": "c", "csharp": "c", "c#": "c",
+    "go": "c", "rust": "c", "bash": "shell", "sh": "shell", "zsh": "shell",
+}
+
+LANGUAGE_HEADER = re.compile(r"^\s*(?:#|//|--)?\s*language\s*:\s*([\w#+]+)", re.IGNORECASE)
+
+
+def normalize_language(name):
+    name = name.lower()
+    name = ALIASES.get(name, name)
+    return name if name in LANGUAGES else None
+
+
+def detect_language(file_path, text):
+    """Picks a language from a "Language:" header or shebang, falling back to the file extension."""
+    lines = text.split("\n", HEADER_LINES)[:HEADER_LINES]
+    if lines and lines[0].startswith("#!"):
+        interpreter = os.path.basename(lines[0][2:].split()[-1] if lines[0][2:].split() else "")
+        language = normalize_language(re.sub(r"[\d.]+$", "", interpreter))
+        if language:
+            return language
+    for line in lines:
+        match = LANGUAGE_HEADER.match(line)
+        if match:
+            return normalize_language(match.group(1))
+    if file_path:
+        return EXTENSIONS.get(os.path.splitext(file_path)[1].lower())
+    return None
+
+
+def make_format(color, bold=False, italic=False):
+    fmt = QTextCharFormat()
+    fmt.setForeground(QColor(color))
+    if bold:
+        fmt.setFontWeight(QFont.Bold)
+    fmt.setFontItalic(italic)
+    return fmt
+
+
+class SyntaxHighlighter(QSyntaxHighlighter):
+    """Regex highlighter with per-block lexer state and time-sliced catch-up.
+
+    The block state records whether a block ends inside a multi-line comment or
+    string, so QSyntaxHighlighter re-highlights an edited block and then only
+    continues into following blocks while their state keeps changing.
+
+    Blocks reached after the frame budget is spent are left for later
+    event-loop turns. New blocks are marked PENDING, which lets Qt walk through
+    the rest of a paste cheaply; resuming at the first PENDING block then
+    highlights the whole run, because each block's state changes from PENDING.
+    """
+
+    def __init__(self, document, language):
+        super().__init__(document)
+        spec = LANGUAGES[language]
+        self.language = language
+        self.keyword_format = make_format("#0033b3", bold=True)
+        self.string_format = make_format("#067d17")
+        self.comment_format = make_format("#8c8c8c", italic=True)
+        self.number_format = make_format("#1750eb")
+        self.formats = {
+            "comment": self.comment_format,
+            "string": self.string_format,
+            "number": self.number_format,
+            "keyword": self.keyword_format,
+        }
+
+        # States 1..n mean "inside the n-th multi-line delimiter pair"
+        self.delimiters = [pair if isinstance(pair, tuple) else (pair, pair) for pair in spec["multiline"]]
+        flags = re.IGNORECASE if spec.get("ignore_case") else 0
+        parts = [f"(?P<open{number}>{re.escape(start)})" for number, (start, _) in enumerate(self.delimiters, 1)]
+        parts += [
+            f"(?P<comment>{re.escape(spec['line_comment'])}.*)",
+            r"(?P<string>\"(?:[^\"\\]|\\.)*\"?|'(?:[^'\\]|\\.)*'?|`(?:[^`\\]|\\.)*`?)",
+            r"(?P<number>\b(?:0[xX][0-9a-fA-F]+|\d+\.?\d*(?:[eE][+-]?\d+)?)\b)",
+            r"(?P<keyword>\b(?:" + "|".join(map(re.escape, spec["keywords"].split())) + r")\b)",
+        ]
+        self.token_pattern = re.compile("|".join(parts), flags)
+        self.closers = [re.compile(re.escape(end)) for _, end in self.delimiters]
+
+        self.slice_start = None
+        self.pending = deque()
+
+    def highlightBlock(self, text):
+        now = time.perf_counter()
+        if self.slice_start is None:
+            self.slice_start = now
+            QTimer.singleShot(0, self.end_slice)
+        elif now - self.slice_start > FRAME_BUDGET:
+            old_state = self.currentBlockState()
+            if old_state == -1:
+                self.setCurrentBlockState(PENDING)
+            # Queue the first block of each PENDING run; a block with a real
+            # state keeps it, so Qt stops walking at the end of the edit
+            if old_state != -1 or self.previousBlockState() != PENDING:
+                self.pending.append(self.currentBlock())
+            return
+        spans, state = self.lex(text, self.previousBlockState())
+        for start, length, fmt in spans:
+            self.setFormat(start, length, fmt)
+        self.setCurrentBlockState(state)
+
+    def lex(self, text, state):
+        """Returns ([(start, length, format)], end_state) for one block."""
+        if not 0 < state <= len(self.delimiters):
+            state = NORMAL
+        spans = []
+        position = 0
+        if state != NORMAL:
+            end = self.closers[state - 1].search(text)
+            if end is None:
+                return [(0, len(text), self.comment_or_string(state))], state
+            position = end.end()
+            spans.append((0, position, self.comment_or_string(state)))
+
+        while True:
+            match = self.token_pattern.search(text, position)
+            if match is None:
+                return spans, NORMAL
+            kind = match.lastgroup
+            start = match.start()
+            if kind.startswith("open"):
+                number = int(kind[4:])
+                end = self.closers[number - 1].search(text, match.end())
+                if end is None:
+                    spans.append((start, len(text) - start, self.comment_or_string(number)))
+                    return spans, number
+                spans.append((start, end.end() - start, self.comment_or_string(number)))
+                position = end.end()
+                continue
+            spans.append((start, match.end() - start, self.formats[kind]))
+            position = max(match.end(), start + 1)
+
+    def comment_or_string(self, state):
+        start = self.delimiters[state - 1][0]
+        return self.string_format if start[0] in "\"'" else self.comment_format
+
+    def end_slice(self):
+        self.slice_start = None
+        if self.pending:
+            QTimer.singleShot(0, self.process_pending)
+
+    def process_pending(self):
+        """Highlights queued blocks for one frame budget, then relayouts once.
+
+        rehighlightBlock() would make the editor relayout after every block,
+        which costs milliseconds each on large documents. Instead this writes
+        formats and states straight into the blocks, then marks the touched
+        range dirty in one go.
+        """
+        self.slice_start = time.perf_counter()
+        document = self.document()
+        first, last = None, None
+        while self.pending and time.perf_counter() - self.slice_start <= FRAME_BUDGET:
+            block = self.pending.popleft()
+            # Like Qt, carry on to the next block while states keep changing
+            while block.isValid():
+                if time.perf_counter() - self.slice_start > FRAME_BUDGET:
+                    self.pending.appendleft(block)
+                    break
+                previous = block.previous()
+                old_state = block.userState()
+                spans, state = self.lex(block.text(), previous.userState() if previous.isValid() else -1)
+                ranges = []
+                for start, length, fmt in spans:
+                    format_range = QTextLayout.FormatRange()
+                    format_range.start, format_range.length, format_range.format = start, length, fmt
+                    ranges.append(format_range)
+                block.layout().setFormats(ranges)
+                block.setUserState(state)
+                first = block.position() if first is None else min(first, block.position())
+                last = max(last or 0, block.position() + block.length())
+                if state == old_state:
+                    break
+                block = block.next()
+        if first is not None and document is not None:
+            document.markContentsDirty(first, last - first)
+        QTimer.singleShot(0, self.end_slice)
@@ -0,0 +1,181 @@
+import difflib
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+DIGEST_SIZE = 16
+CHUNK_MIN_BYTES = 1024
+CHUNK_MAX_BYTES = 64 * 1024
+CHUNK_BOUNDARY_MASK = 0x3F  # A line ends a chunk with probability 1/64
+GROUP_BOUNDARY_MASK = 0x3F  # Likewise for chunk hashes ending a manifest group
+SELECT_BATCH = 500
+
+Version = namedtuple("Version", "id path created size")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    hash BLOB PRIMARY KEY,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    created REAL NOT NULL,
+    size INTEGER NOT NULL,
+    digest BLOB NOT NULL,
+    manifest BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS versions_path ON versions(path, id);
+"""
+
+
+def digest(data):
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).digest()
+
+
+def split_chunks(data):
+    """Splits bytes into content-defined chunks that end on line boundaries.
+
+    Whether a line closes a chunk depends only on that line's own bytes, so an
+    edit changes the chunks around it and leaves the rest of the note's
+    chunks, and their hashes, as they were.
+    """
+    chunks = []
+    start = 0
+    position = 0
+    length = len(data)
+    while position < length:
+        end = data.find(b"\n", position)
+        end = length if end < 0 else end + 1
+        size = end - start
+        if size >= CHUNK_MAX_BYTES:
+            # One very long line: fall back to fixed-size pieces
+            while end - start >= CHUNK_MAX_BYTES:
+                chunks.append(data[start:start + CHUNK_MAX_BYTES])
+                start += CHUNK_MAX_BYTES
+        elif size >= CHUNK_MIN_BYTES and zlib.crc32(data[position:end]) & CHUNK_BOUNDARY_MASK == 0:
+            chunks.append(data[start:end])
+            start = end
+        position = end
+    if start < length:
+        chunks.append(data[start:])
+    return chunks
+
+
+def split_groups(hashes):
+    """Groups chunk hashes into content-defined runs for a two-level manifest.
+
+    Each group is stored as a chunk of its own, so a version only adds a few
+    group hashes plus the groups touched by an edit, not one hash per chunk.
+    """
+    groups = []
+    start = 0
+    for position, chunk_hash in enumerate(hashes, 1):
+        if chunk_hash[-1] & GROUP_BOUNDARY_MASK == 0:
+            groups.append(b"".join(hashes[start:position]))
+            start = position
+    if start < len(hashes):
+        groups.append(b"".join(hashes[start:]))
+    return groups
+
+
+def split_hashes(blob):
+    return [blob[offset:offset + DIGEST_SIZE] for offset in range(0, len(blob), DIGEST_SIZE)]
+
+
+class HistoryStore:
+    """Content-addressed, compressed snapshots of notes kept in one SQLite file."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.local = threading.local()
+
+    def connection(self):
+        # SQLite connections cannot be shared between the GUI and writer threads
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self.local.conn = conn
+        return conn
+
+    def record(self, path, text):
+        """Stores a snapshot of text for path unless it matches the latest one.
+
+        Returns the new version id, or None if nothing changed.
+        """
+        path = os.path.abspath(path)
+        data = text.encode("utf-8")
+        content_digest = digest(data)
+        conn = self.connection()
+        latest = conn.execute("SELECT digest FROM versions WHERE path = ? ORDER BY id DESC LIMIT 1",
+                              (path,)).fetchone()
+        if latest is not None and latest[0] == content_digest:
+            return None
+
+        chunks = split_chunks(data)
+        hashes = [digest(chunk) for chunk in chunks]
+        groups = split_groups(hashes)
+        group_hashes = [digest(group) for group in groups]
+        with conn:
+            self.store_chunks(conn, hashes + group_hashes, chunks + groups)
+            cursor = conn.execute(
+                "INSERT INTO versions (path, created, size, digest, manifest) VALUES (?, ?, ?, ?, ?)",
+                (path, time.time(), len(data), content_digest, b"".join(group_hashes)),
+            )
+        return cursor.lastrowid
+
+    def store_chunks(self, conn, hashes, chunks):
+        known = set()
+        for offset in range(0, len(hashes), SELECT_BATCH):
+            batch = hashes[offset:offset + SELECT_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            known.update(row[0] for row in conn.execute(
+                f"SELECT hash FROM chunks WHERE hash IN ({placeholders})", batch))
+        new_chunks = {}
+        for chunk_hash, chunk in zip(hashes, chunks):
+            if chunk_hash not in known and chunk_hash not in new_chunks:
+                new_chunks[chunk_hash] = zlib.compress(chunk, 6)
+        conn.executemany("INSERT INTO chunks VALUES (?, ?)", new_chunks.items())
+
+    def fetch_chunks(self, conn, hashes):
+        unique = list(dict.fromkeys(hashes))
+        data = {}
+        for offset in range(0, len(unique), SELECT_BATCH):
+            batch = unique[offset:offset + SELECT_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            for chunk_hash, chunk in conn.execute(
+                    f"SELECT hash, data FROM chunks WHERE hash IN ({placeholders})", batch):
+                data[chunk_hash] = zlib.decompress(chunk)
+        return [data[chunk_hash] for chunk_hash in hashes]
+
+    def versions(self, path):
+        """Lists every version of path, newest first."""
+        rows = self.connection().execute(
+            "SELECT id, path, created, size FROM versions WHERE path = ? ORDER BY id DESC",
+            (os.path.abspath(path),),
+        )
+        return [Version(*row) for row in rows]
+
+    def load(self, version_id):
+        """Reassembles the text of a version."""
+        conn = self.connection()
+        row = conn.execute("SELECT manifest FROM versions WHERE id = ?", (version_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No such version: {version_id}")
+        groups = self.fetch_chunks(conn, split_hashes(row[0]))
+        hashes = split_hashes(b"".join(groups))
+        return b"".join(self.fetch_chunks(conn, hashes)).decode("utf-8")
+
+    def diff(self, old_id, new_id, context=3):
+        """Returns a unified diff between two versions."""
+        old = self.load(old_id).splitlines(keepends=True)
+        new = self.load(new_id).splitlines(keepends=True)
+        return "".join(difflib.unified_diff(old, new, f"version {old_id}", f"version {new_id}", n=context))
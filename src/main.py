@@ -1,49 +1,763 @@
+import codecs
+import json
+import logging
+import mmap
+import os
+import queue
+import re
 import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+STARTUP_BEGIN = time.perf_counter()
+
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QTextEdit, QMenuBar, QAction, QFileDialog,
-    QMessageBox, QInputDialog, QFontDialog, QToolBar, QTabWidget, QWidget
+    QMessageBox, QInputDialog, QFontDialog, QToolBar, QTabWidget, QWidget,
+    QDockWidget, QLineEdit, QListWidget, QListWidgetItem, QVBoxLayout, QLabel,
+    QCheckBox, QShortcut, QProgressDialog, QDialog, QPlainTextEdit, QHBoxLayout,
+    QPushButton, QAbstractItemView
+)
+from PyQt5.QtGui import QFont, QIcon, QTextCursor, QTextCharFormat, QColor, QKeySequence
+from PyQt5.QtCore import (
+    Qt, QPoint, QSettings, QTimer, QThread, QFileSystemWatcher, QDateTime, QStandardPaths, pyqtSignal
 )
-from PyQt5.QtGui import QFont, QIcon, QTextCursor, QTextCharFormat
-from PyQt5.QtCore import QSettings, QTimer
-from fpdf import FPDF
 
+from autosave import JournalWriter
+from highlighter import HEADER_LINES, SyntaxHighlighter, detect_language
+from note_store import NOTES_DIR, NoteStore
+from profiling import StallMonitor
+from text_search import compile_pattern, iter_match_batches
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LARGE_FILE_THRESHOLD = 50 * 1024 * 1024  # Files above this size are streamed in
+LOAD_CHUNK_SIZE = 128 * 1024  # Small enough to append within one frame
+LOAD_CHUNKS_IN_FLIGHT = 4
+AUTO_SAVE_INTERVAL = 300000  # Auto-save every 5 minutes
+MAX_VISIBLE_HIGHLIGHTS = 5000
+
+
+class StartupTimer:
+    """Records named milestones since process start for the startup timing report."""
+
+    def __init__(self, begin):
+        self.begin = begin
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter()))
+
+    def report(self):
+        lines = ["Startup timing (step / since start):"]
+        previous = self.begin
+        for name, moment in self.marks:
+            lines.append(f"  {name:<24}{(moment - previous) * 1000:8.1f} ms{(moment - self.begin) * 1000:10.1f} ms")
+            previous = moment
+        return "\n".join(lines)
+
+
+STARTUP = StartupTimer(STARTUP_BEGIN)
+STARTUP.mark("imports")
+
+
+class FileLoader(QThread):
+    """Memory-maps a file and emits its decoded text in chunks."""
+
+    chunk_loaded = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_path, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        # Keeps the worker from queueing the whole file while the GUI catches up
+        self.slots = threading.Semaphore(LOAD_CHUNKS_IN_FLIGHT)
+
+    def chunk_consumed(self):
+        self.slots.release()
+
+    def run(self):
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        pending_cr = ""
+        try:
+            with open(self.file_path, "rb") as file:
+                size = os.fstat(file.fileno()).st_size
+                if size == 0:
+                    return
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for offset in range(0, size, LOAD_CHUNK_SIZE):
+                        final = offset + LOAD_CHUNK_SIZE >= size
+                        text = pending_cr + decoder.decode(mapped[offset:offset + LOAD_CHUNK_SIZE], final)
+                        # A "\r\n" pair may straddle two chunks
+                        pending_cr = "\r" if text.endswith("\r") and not final else ""
+                        if pending_cr:
+                            text = text[:-1]
+                        text = text.replace("\r\n", "\n").replace("\r", "\n")
+                        while not self.slots.acquire(timeout=0.1):
+                            if self.isInterruptionRequested():
+                                return
+                        if self.isInterruptionRequested():
+                            return
+                        self.chunk_loaded.emit(text)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class TextEditor(QPlainTextEdit):
+    # Plain text only; unlike QTextEdit, QPlainTextEdit lays out lines lazily,
+    # which keeps large and streamed files responsive
+    loading_finished = pyqtSignal()
+    viewport_resized = pyqtSignal()
 
-class TextEditor(QTextEdit):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setFont(QFont("Arial", 14))
         self.file_path = None
-        self.auto_save_timer = QTimer(self)
-        self.auto_save_timer.timeout.connect(self.auto_save)
-        self.auto_save_timer.start(300000)  # Auto-save every 5 minutes
+        self.loader = None
+        self.highlighter = None
+        self.large_file = False
+        self.reset_tracking()
+        self.document().contentsChange.connect(self.track_change)
+
+    def load_file(self, file_path, threshold=LARGE_FILE_THRESHOLD):
+        if os.path.getsize(file_path) <= threshold:
+            with open(file_path, "r", encoding="utf-8") as file:
+                text = file.read()
+            self.file_path = file_path
+            # Attaching the highlighter while the document is still empty lets it
+            # highlight inside setPlainText's change instead of in a full rehighlight
+            self.update_highlighter(text[:4096])
+            self.setPlainText(text)
+            self.reset_tracking()
+            self.loading_finished.emit()
+            return
+
+        # Large file: show the tab immediately and stream the rest in
+        self.file_path = file_path
+        self.large_file = True  # Also skips syntax highlighting
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.loader = FileLoader(file_path, self)
+        self.loader.chunk_loaded.connect(self.append_chunk)
+        self.loader.failed.connect(self.loading_failed)
+        self.loader.finished.connect(self.finish_loading)
+        self.loader.start()
+
+    def update_highlighter(self, header=None):
+        if header is None:
+            block = self.document().firstBlock()
+            lines = []
+            while block.isValid() and len(lines) < HEADER_LINES:
+                lines.append(block.text())
+                block = block.next()
+            header = "\n".join(lines)
+        language = None if self.large_file else detect_language(self.file_path, header)
+        current = self.highlighter.language if self.highlighter is not None else None
+        if language == current:
+            return
+        if self.highlighter is not None:
+            self.highlighter.setDocument(None)
+            self.highlighter.deleteLater()
+            self.highlighter = None
+        if language is not None:
+            self.highlighter = SyntaxHighlighter(self.document(), language)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.viewport_resized.emit()
+
+    def is_loading(self):
+        return self.loader is not None
+
+    def append_chunk(self, text):
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        if self.loader is not None:
+            self.loader.chunk_consumed()
+
+    def loading_failed(self, message):
+        # Never auto-save a partially loaded file over the original
+        self.file_path = None
+        QMessageBox.critical(self, "Error", f"Failed to open file: {message}")
+
+    def finish_loading(self):
+        self.loader = None
+        self.setUndoRedoEnabled(True)
+        self.setReadOnly(False)
+        self.document().setModified(False)
+        self.reset_tracking()
+        self.loading_finished.emit()
+
+    def cancel_loading(self):
+        if self.loader is not None:
+            self.loader.requestInterruption()
+            self.loader.wait()
+
+    def reset_tracking(self):
+        # Blocks before dirty_start and the last dirty_tail blocks match the file on disk
+        self.saved_block_count = self.document().blockCount()
+        self.dirty_start = None
+        self.dirty_tail = 0
+
+    def track_change(self, position, removed, added):
+        document = self.document()
+        last_block = document.blockCount() - 1
+        first = document.findBlock(position).blockNumber()
+        last = document.findBlock(position + added).blockNumber()
+        first = last_block if first < 0 else first
+        last = last_block if last < 0 else last
+        tail = last_block - last
+        if self.dirty_start is None:
+            self.dirty_start, self.dirty_tail = first, tail
+        else:
+            self.dirty_start = min(self.dirty_start, first)
+            self.dirty_tail = min(self.dirty_tail, tail)
+
+    def is_dirty(self):
+        return self.dirty_start is not None
+
+    def session_state(self):
+        if not self.file_path:
+            return None
+        return {
+            "path": self.file_path,
+            "cursor": self.textCursor().position(),
+            "scroll": self.verticalScrollBar().value(),
+        }
+
+    def restore_position(self, cursor_position, scroll):
+        if self.is_loading():
+            self.loading_finished.connect(lambda: self.restore_position(cursor_position, scroll))
+            return
+        cursor = self.textCursor()
+        cursor.setPosition(min(cursor_position, self.document().characterCount() - 1))
+        self.setTextCursor(cursor)
+        # The scroll range is only known once the document has been laid out
+        QTimer.singleShot(0, lambda: self.verticalScrollBar().setValue(scroll))
+
+    def auto_save(self, writer):
+        if not self.file_path or self.is_loading():
+            return
+        if writer.is_stale(self.file_path):
+            # An earlier save failed, so the file may not hold the blocks we think are saved
+            writer.submit_write(self.file_path, self.toPlainText())
+            self.reset_tracking()
+            return
+        if not self.is_dirty():
+            return
+        document = self.document()
+        start = self.dirty_start
+        tail = min(self.dirty_tail, self.saved_block_count - start, document.blockCount() - start)
+        block = document.findBlockByNumber(start)
+        lines = []
+        for _ in range(document.blockCount() - tail - start):
+            lines.append(block.text().replace("\u2028", "\n"))
+            block = block.next()
+        writer.submit_patch(self.file_path, start, self.saved_block_count - tail, lines)
+        self.reset_tracking()
+
+
+class TabPlaceholder(QWidget):
+    """Stands in for a restored tab until it is first activated."""
+
+    def __init__(self, state, parent=None):
+        super().__init__(parent)
+        self.state = state
+
+    def session_state(self):
+        return self.state
+
+
+class IndexUpdater(QThread):
+    """Brings the notes index up to date off the GUI thread."""
+
+    updated = pyqtSignal(int)
+
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.index = index
+
+    def run(self):
+        try:
+            self.updated.emit(self.index.update())
+        except Exception:
+            self.updated.emit(-1)
+
+
+class SearchPanel(QDockWidget):
+    """Dock panel that searches every note through the on-disk notes index."""
+
+    note_activated = pyqtSignal(str)
+
+    def __init__(self, store, parent=None):
+        super().__init__("Search All Notes", parent)
+        self.index = store.index()
+        self.updater = IndexUpdater(self.index, self)
+        self.updater.updated.connect(self.index_updated)
+        self.update_pending = False
+
+        # Debounce bursts of filesystem events into one incremental update
+        self.update_timer = QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(500)
+        self.update_timer.timeout.connect(self.update_index)
+        self.watcher = QFileSystemWatcher(self)
+        if os.path.isdir(store.root):
+            self.watcher.addPath(store.root)
+        self.watcher.directoryChanged.connect(lambda _: self.update_timer.start())
+
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("keywords  tag:python  date:2025-06  after:2025-01-01")
+        self.query_edit.returnPressed.connect(self.run_search)
+        self.status_label = QLabel()
+        self.results = QListWidget()
+        self.results.itemActivated.connect(lambda item: self.note_activated.emit(item.data(Qt.UserRole)))
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.query_edit)
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.results)
+        container = QWidget()
+        container.setLayout(layout)
+        self.setWidget(container)
+
+    def update_index(self):
+        if self.updater.isRunning():
+            self.update_pending = True
+        else:
+            self.status_label.setText("Updating index...")
+            self.updater.start()
+
+    def index_updated(self, changes):
+        if changes < 0:
+            self.status_label.setText("Index update failed")
+        else:
+            self.status_label.setText("")
+        if self.update_pending:
+            self.update_pending = False
+            self.update_index()
+        elif changes > 0 and self.query_edit.text():
+            self.run_search()
+
+    def run_search(self):
+        self.results.clear()
+        try:
+            notes = self.index.search(self.query_edit.text())
+        except Exception as e:
+            self.status_label.setText(f"Search failed: {e}")
+            return
+        for note in notes:
+            tags = f"  [{', '.join(note.tags)}]" if note.tags else ""
+            item = QListWidgetItem(f"{note.date}  {note.title}{tags}")
+            item.setData(Qt.UserRole, note.path)
+            item.setToolTip(note.path)
+            self.results.addItem(item)
+        self.status_label.setText(f"{len(notes)} notes")
+
+    def stop(self):
+        self.updater.wait()
+
+
+class SearchWorker(QThread):
+    """Scans a snapshot of the document once and emits matches in batches."""
+
+    matches_found = pyqtSignal(int, object, object)
+
+    def __init__(self, generation, text, pattern, parent=None):
+        super().__init__(parent)
+        self.generation = generation
+        self.text = text
+        self.pattern = pattern
+
+    def run(self):
+        for starts, ends in iter_match_batches(self.text, self.pattern):
+            if self.isInterruptionRequested():
+                return
+            self.matches_found.emit(self.generation, starts, ends)
+
+
+class FindBar(QToolBar):
+    """Find bar that highlights matches in the visible part of the editor only."""
+
+    def __init__(self, parent=None):
+        super().__init__("Find", parent)
+        self.editor = None
+        self.worker = None
+        self.generation = 0
+        self.starts = []
+        self.ends = []
+        self.current = -1
+
+        self.match_format = QTextCharFormat()
+        self.match_format.setBackground(Qt.yellow)
+        self.current_format = QTextCharFormat()
+        self.current_format.setBackground(QColor(255, 150, 50))
+
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("Find")
+        self.query_edit.textChanged.connect(lambda _: self.research_timer.start())
+        self.query_edit.returnPressed.connect(self.find_next)
+        self.regex_box = QCheckBox("Regex")
+        self.regex_box.toggled.connect(self.start_search)
+        self.case_box = QCheckBox("Match case")
+        self.case_box.toggled.connect(self.start_search)
+        self.count_label = QLabel()
+
+        self.addWidget(self.query_edit)
+        self.addWidget(self.regex_box)
+        self.addWidget(self.case_box)
+        self.addAction("Previous", self.find_previous)
+        self.addAction("Next", self.find_next)
+        self.addWidget(self.count_label)
+        self.addAction("Close", self.close_bar)
+        QShortcut(QKeySequence(Qt.Key_Escape), self, self.close_bar)
+
+        # Coalesces typing and document edits into one rescan
+        self.research_timer = QTimer(self)
+        self.research_timer.setSingleShot(True)
+        self.research_timer.setInterval(200)
+        self.research_timer.timeout.connect(self.start_search)
+
+    def attach(self, editor):
+        if editor is self.editor:
+            return
+        self.detach()
+        self.editor = editor
+        if editor is not None:
+            editor.document().contentsChange.connect(self.document_changed)
+            editor.verticalScrollBar().valueChanged.connect(self.refresh_highlights)
+            editor.horizontalScrollBar().valueChanged.connect(self.refresh_highlights)
+            editor.viewport_resized.connect(self.refresh_highlights)
+            if self.isVisible():
+                self.start_search()
+
+    def detach(self):
+        self.stop_worker()
+        if self.editor is not None:
+            self.editor.document().contentsChange.disconnect(self.document_changed)
+            self.editor.verticalScrollBar().valueChanged.disconnect(self.refresh_highlights)
+            self.editor.horizontalScrollBar().valueChanged.disconnect(self.refresh_highlights)
+            self.editor.viewport_resized.disconnect(self.refresh_highlights)
+            self.editor.setExtraSelections([])
+        self.editor = None
+        self.starts, self.ends, self.current = [], [], -1
 
-    def auto_save(self):
-        if self.file_path:
+    def document_changed(self, position, removed, added):
+        # contentsChange, unlike textChanged, is not emitted by syntax highlighting
+        self.research_timer.start()
+
+    def open_bar(self, editor):
+        self.show()
+        self.attach(editor)
+        self.query_edit.setFocus()
+        self.query_edit.selectAll()
+        self.start_search()
+
+    def close_bar(self):
+        self.detach()
+        self.count_label.clear()
+        self.hide()
+        if self.parent() is not None and self.parent().current_editor() is not None:
+            self.parent().current_editor().setFocus()
+
+    def stop_worker(self):
+        self.generation += 1
+        if self.worker is not None:
+            self.worker.requestInterruption()
+            self.worker = None
+
+    def stop(self):
+        self.detach()
+        for worker in self.findChildren(SearchWorker):
+            worker.requestInterruption()
+            worker.wait()
+
+    def start_search(self):
+        self.stop_worker()
+        self.starts, self.ends, self.current = [], [], -1
+        self.count_label.setStyleSheet("")
+        if self.editor is None or not self.isVisible() or not self.query_edit.text():
+            self.count_label.clear()
+            self.refresh_highlights()
+            return
+        try:
+            pattern = compile_pattern(self.query_edit.text(), self.regex_box.isChecked(), self.case_box.isChecked())
+        except re.error as e:
+            self.count_label.setStyleSheet("color: red")
+            self.count_label.setText(f"Invalid pattern: {e}")
+            self.refresh_highlights()
+            return
+        self.count_label.setText("Searching...")
+        self.worker = SearchWorker(self.generation, self.editor.toPlainText(), pattern, self)
+        self.worker.matches_found.connect(self.add_matches)
+        self.worker.finished.connect(self.search_finished)
+        self.worker.start()
+
+    def add_matches(self, generation, starts, ends):
+        if generation != self.generation:
+            return
+        first_batch = not self.starts
+        self.starts.extend(starts)
+        self.ends.extend(ends)
+        if first_batch:
+            self.current = self.index_from(self.editor.textCursor().selectionStart())
+        self.update_count()
+        self.refresh_highlights()
+
+    def search_finished(self):
+        worker = self.sender()
+        if worker is self.worker:
+            self.worker = None
+            self.update_count()
+        worker.deleteLater()
+
+    def update_count(self):
+        if not self.starts:
+            self.count_label.setText("No matches" if self.worker is None else "Searching...")
+        else:
+            suffix = "+" if self.worker is not None else ""
+            self.count_label.setText(f"{self.current + 1} of {len(self.starts)}{suffix}")
+
+    def index_from(self, position):
+        index = bisect_left(self.starts, position)
+        return index if index < len(self.starts) else 0
+
+    def refresh_highlights(self):
+        if self.editor is None:
+            return
+        if not self.starts:
+            self.editor.setExtraSelections([])
+            return
+        viewport = self.editor.viewport()
+        top = self.editor.cursorForPosition(QPoint(0, 0)).position()
+        bottom = self.editor.cursorForPosition(QPoint(viewport.width(), viewport.height())).position()
+        first = bisect_right(self.ends, top)
+        last = min(bisect_left(self.starts, bottom + 1), first + MAX_VISIBLE_HIGHLIGHTS)
+
+        selections = []
+        document = self.editor.document()
+        for index in range(first, last):
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = QTextCursor(document)
+            selection.cursor.setPosition(self.starts[index])
+            selection.cursor.setPosition(self.ends[index], QTextCursor.KeepAnchor)
+            selection.format = self.current_format if index == self.current else self.match_format
+            selections.append(selection)
+        self.editor.setExtraSelections(selections)
+
+    def find_next(self):
+        self.move_to(self.index_from(self.editor.textCursor().selectionEnd()) if self.starts else -1)
+
+    def find_previous(self):
+        if self.starts:
+            index = bisect_left(self.starts, self.editor.textCursor().selectionStart()) - 1
+            self.move_to(index % len(self.starts))
+
+    def move_to(self, index):
+        if index < 0 or self.editor is None:
+            return
+        self.current = index
+        cursor = self.editor.textCursor()
+        cursor.setPosition(self.starts[index])
+        cursor.setPosition(self.ends[index], QTextCursor.KeepAnchor)
+        self.editor.setTextCursor(cursor)
+        self.editor.ensureCursorVisible()
+        self.update_count()
+        self.refresh_highlights()
+
+
+class PdfExportJob(QProgressDialog):
+    """Runs a PDF export in a separate process and shows its progress."""
+
+    def __init__(self, source_path, output_path, font_path, temp_source=False, parent=None):
+        super().__init__("Exporting to PDF...", "Cancel", 0, 1000, parent)
+        import multiprocessing
+        from pdf_export import export_worker
+
+        self.setWindowTitle("Export to PDF")
+        self.setMinimumDuration(500)
+        self.setAutoClose(False)
+        self.setAutoReset(False)
+        self.source_path = source_path
+        self.temp_source = temp_source
+        self.completed = False
+
+        # Spawn rather than fork: forking a process that runs a Qt event loop is unsafe
+        context = multiprocessing.get_context("spawn")
+        self.messages = context.Queue()
+        self.cancel_event = context.Event()
+        self.process = context.Process(
+            target=export_worker,
+            args=(source_path, output_path, font_path, self.messages, self.cancel_event),
+            daemon=True,
+        )
+        self.canceled.connect(self.cancel_event.set)
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll)
+
+    def start(self):
+        self.process.start()
+        self.poll_timer.start(100)
+
+    def poll(self):
+        while True:
             try:
-                with open(self.file_path, "w", encoding="utf-8") as file:
-                    file.write(self.toPlainText())
-            except Exception as e:
-                QMessageBox.critical(self, "Auto-Save Error", str(e))
+                kind, first, second = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                self.setValue(int(1000 * first / second) if second else 1000)
+            else:
+                self.finish(kind, second)
+                return
+        if not self.process.is_alive() and self.messages.empty():
+            self.finish("error", f"Export process exited with code {self.process.exitcode}")
+
+    def finish(self, kind, message):
+        if self.completed:
+            return
+        self.completed = True
+        self.poll_timer.stop()
+        self.process.join(5)
+        if self.temp_source:
+            os.unlink(self.source_path)
+        self.close()
+        if kind == "error":
+            QMessageBox.critical(self.parent(), "Error", f"PDF export failed: {message}")
+        self.deleteLater()
+
+    def stop(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.finish("cancelled", None)
+
+
+class HistoryDialog(QDialog):
+    """Lists saved versions of the current note, diffs them and restores one."""
+
+    def __init__(self, store, editor, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.editor = editor
+        self.setWindowTitle(f"History - {os.path.basename(editor.file_path)}")
+        self.resize(800, 600)
+
+        self.version_list = QListWidget()
+        self.version_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        for version in store.versions(editor.file_path):
+            created = QDateTime.fromMSecsSinceEpoch(int(version.created * 1000)).toString("yyyy-MM-dd hh:mm:ss")
+            item = QListWidgetItem(f"#{version.id}  {created}  {version.size} bytes")
+            item.setData(Qt.UserRole, version.id)
+            self.version_list.addItem(item)
+        self.diff_view = QPlainTextEdit()
+        self.diff_view.setReadOnly(True)
+        self.diff_view.setFont(QFont("Courier New", 10))
+
+        diff_button = QPushButton("Diff")
+        diff_button.setToolTip("Compare two selected versions, or one version with the editor")
+        diff_button.clicked.connect(self.show_diff)
+        restore_button = QPushButton("Restore")
+        restore_button.clicked.connect(self.restore)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.reject)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(diff_button)
+        buttons.addWidget(restore_button)
+        buttons.addStretch()
+        buttons.addWidget(close_button)
+        layout = QVBoxLayout()
+        layout.addWidget(self.version_list, 1)
+        layout.addWidget(self.diff_view, 2)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+    def selected_ids(self):
+        return sorted(item.data(Qt.UserRole) for item in self.version_list.selectedItems())
+
+    def show_diff(self):
+        import difflib
+
+        ids = self.selected_ids()
+        try:
+            if len(ids) == 2:
+                diff = self.store.diff(ids[0], ids[1])
+            elif len(ids) == 1:
+                old = self.store.load(ids[0]).splitlines(keepends=True)
+                new = self.editor.toPlainText().splitlines(keepends=True)
+                diff = "".join(difflib.unified_diff(old, new, f"version {ids[0]}", "editor"))
+            else:
+                QMessageBox.information(self, "History", "Select one or two versions to compare.")
+                return
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not load version: {e}")
+            return
+        self.diff_view.setPlainText(diff or "No differences.")
+
+    def restore(self):
+        ids = self.selected_ids()
+        if len(ids) != 1:
+            QMessageBox.information(self, "History", "Select the version to restore.")
+            return
+        try:
+            text = self.store.load(ids[0])
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not load version: {e}")
+            return
+        # Replace through a cursor so the restore can be undone and gets auto-saved
+        cursor = QTextCursor(self.editor.document())
+        cursor.select(QTextCursor.Document)
+        cursor.insertText(text)
+        self.accept()
 
 
 class Notebook(QMainWindow):
+    auto_save_failed = pyqtSignal(str, str)
+
     def __init__(self):
         super().__init__()
         self.settings = QSettings("MyCompany", "NotebookApp")
         self.current_theme = "light"
+        self.css_cache = {}
+        self.search_panel = None
+        # Like theme paths, a relative notes folder is relative to the app, not the working directory
+        self.store = NoteStore(os.path.join(BASE_DIR, self.settings.value("notes_dir", NOTES_DIR)))
+        self.auto_save_failed.connect(self.show_auto_save_error)
+        self.stall_monitor = StallMonitor(parent=self)
+        self.stall_monitor.set_enabled(self.settings.value("profiling/enabled", False, type=bool)
+                                       or bool(os.environ.get("NOTEBOOK_PROFILE")))
+        self.history = None
+        self.history_lock = threading.Lock()
+        self.history_path = self.settings.value("history_db", os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.AppDataLocation), "history.sqlite3"))
+        self.writer = JournalWriter(on_error=self.auto_save_failed.emit, snapshot=self.record_history)
+        self.auto_save_timer = QTimer(self)
+        self.auto_save_timer.timeout.connect(self.stall_monitor.timed("Auto-save", self.auto_save_all))
+        self.auto_save_timer.start(AUTO_SAVE_INTERVAL)
         self.init_ui()
 
     def init_ui(self):
         self.setWindowTitle("Notebook")
         self.setGeometry(100, 100, 800, 600)
         self.load_theme()
+        STARTUP.mark("theme")
+
+        self.find_bar = FindBar(self)
+        self.addToolBar(Qt.BottomToolBarArea, self.find_bar)
+        self.find_bar.hide()
 
         self.tabs = QTabWidget()
         self.setCentralWidget(self.tabs)
-        self.new_tab()
+        self.tabs.currentChanged.connect(self.tab_changed)
+        if not self.restore_session():
+            self.new_tab()
+        STARTUP.mark("session restored")
 
         self.create_menus()
         self.create_toolbar()
+        STARTUP.mark("window built")
 
     def new_tab(self):
         editor = TextEditor()
@@ -51,135 +765,309 @@ class Notebook(QMainWindow):
         self.tabs.setCurrentIndex(index)
 
     def current_editor(self):
-        return self.tabs.currentWidget()
+        return self.materialize_tab(self.tabs.currentIndex())
+
+    def editors(self):
+        for index in range(self.tabs.count()):
+            widget = self.tabs.widget(index)
+            if isinstance(widget, TextEditor):
+                yield widget
+
+    def find_tab(self, file_path):
+        """Returns the index of the tab showing file_path, or -1 if it is not open."""
+        file_path = os.path.abspath(file_path)
+        for index in range(self.tabs.count()):
+            state = self.tabs.widget(index).session_state()
+            if state is not None and os.path.abspath(state["path"]) == file_path:
+                return index
+        return -1
+
+    def tab_changed(self, index):
+        editor = self.materialize_tab(index)
+        if self.find_bar.isVisible():
+            self.find_bar.attach(editor)
+
+    def materialize_tab(self, index):
+        placeholder = self.tabs.widget(index)
+        if not isinstance(placeholder, TabPlaceholder):
+            return placeholder
+        state = placeholder.state
+        editor = TextEditor()
+        try:
+            self.writer.reload(state["path"])
+            threshold = self.settings.value("large_file_threshold", LARGE_FILE_THRESHOLD, type=int)
+            editor.load_file(state["path"], threshold)
+            editor.restore_position(state.get("cursor", 0), state.get("scroll", 0))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to open file: {e}")
+
+        # Swap the editor in without re-entering tab_changed
+        was_current = self.tabs.currentIndex() == index
+        self.tabs.blockSignals(True)
+        self.tabs.removeTab(index)
+        self.tabs.insertTab(index, editor, os.path.basename(state["path"]))
+        if was_current:
+            self.tabs.setCurrentIndex(index)
+        self.tabs.blockSignals(False)
+        placeholder.deleteLater()
+        return editor
+
+    def restore_session(self):
+        try:
+            tabs = json.loads(self.settings.value("session/tabs", "[]"))
+        except (TypeError, ValueError):
+            return False
+        unique, seen = [], set()
+        for state in tabs:
+            if isinstance(state, dict) and state.get("path") and os.path.abspath(state["path"]) not in seen:
+                seen.add(os.path.abspath(state["path"]))
+                unique.append(state)
+        tabs = unique
+        if not tabs:
+            return False
+        self.tabs.blockSignals(True)
+        for state in tabs:
+            self.tabs.addTab(TabPlaceholder(state), os.path.basename(state["path"]))
+        current = self.settings.value("session/current", 0, type=int)
+        self.tabs.setCurrentIndex(min(max(current, 0), len(tabs) - 1))
+        self.tabs.blockSignals(False)
+        self.materialize_tab(self.tabs.currentIndex())
+        return True
+
+    def save_session(self):
+        tabs, current = [], 0
+        for index in range(self.tabs.count()):
+            state = self.tabs.widget(index).session_state()
+            if state is None:
+                continue
+            if index == self.tabs.currentIndex():
+                current = len(tabs)
+            tabs.append(state)
+        self.settings.setValue("session/tabs", json.dumps(tabs))
+        self.settings.setValue("session/current", current)
+
+    def auto_save_all(self):
+        for editor in self.editors():
+            editor.auto_save(self.writer)
+
+    def history_store(self):
+        # Called from the auto-save thread as well as the GUI thread
+        with self.history_lock:
+            if self.history is None:
+                from history import HistoryStore
+
+                self.history = HistoryStore(self.history_path)
+            return self.history
+
+    def record_history(self, file_path, text):
+        self.history_store().record(file_path, text)
+
+    def show_history(self):
+        editor = self.current_editor()
+        if editor is None or not editor.file_path:
+            QMessageBox.information(self, "History", "Save the note to start recording its history.")
+            return
+        try:
+            self.writer.flush()  # Pick up snapshots still queued on the writer
+            dialog = HistoryDialog(self.history_store(), editor, self)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not open history: {e}")
+            return
+        dialog.exec_()
+
+    def show_auto_save_error(self, file_path, message):
+        QMessageBox.critical(self, "Auto-Save Error", f"{file_path}: {message}")
 
     def load_theme(self):
         theme = self.settings.value("theme", "styles/light.css")
+        self.current_theme = "dark" if theme.endswith("dark.css") else "light"
         self.apply_css(theme)
 
     def apply_css(self, css_file):
         try:
-            with open(css_file, "r") as file:
-                self.setStyleSheet(file.read())
+            if css_file not in self.css_cache:
+                # Theme paths are stored relative to the app, not the working directory
+                with open(os.path.join(BASE_DIR, css_file), "r") as file:
+                    self.css_cache[css_file] = file.read()
+            self.setStyleSheet(self.css_cache[css_file])
         except Exception as e:
             QMessageBox.critical(self, "Theme Error", f"Could not load theme: {e}")
 
     def create_menus(self):
         menu_bar = self.menuBar()
+        timed = self.stall_monitor.timed
 
         # File Menu
         file_menu = menu_bar.addMenu("File")
-        file_menu.addAction("New", self.new_tab)
-        file_menu.addAction("Open...", self.open_file)
-        file_menu.addAction("Save...", self.save_file)
-        file_menu.addAction("Export to PDF...", self.export_to_pdf)
+        file_menu.addAction("New", timed("New", self.new_tab))
+        file_menu.addAction("New Note...", timed("New Note", self.new_note))
+        file_menu.addAction("Open...", timed("Open", self.open_file))
+        file_menu.addAction("Save...", timed("Save", self.save_file))
+        file_menu.addAction("Export to PDF...", timed("Export to PDF", self.export_to_pdf))
+        file_menu.addAction("History...", timed("History", self.show_history))
         file_menu.addAction("Exit", self.close)
 
         # Edit Menu
         edit_menu = menu_bar.addMenu("Edit")
-        edit_menu.addAction("Find...", self.find_text)
-        edit_menu.addAction("Undo", lambda: self.current_editor().undo())
-        edit_menu.addAction("Redo", lambda: self.current_editor().redo())
+        edit_menu.addAction("Find...", timed("Find", self.find_text), QKeySequence.Find)
+        edit_menu.addAction("Search All Notes...", timed("Search All Notes", self.show_search_panel))
+        edit_menu.addAction("Undo", timed("Undo", lambda: self.current_editor().undo()))
+        edit_menu.addAction("Redo", timed("Redo", lambda: self.current_editor().redo()))
 
         # View Menu
         view_menu = menu_bar.addMenu("View")
-        view_menu.addAction("Toggle Theme", self.toggle_theme)
+        view_menu.addAction("Toggle Theme", timed("Toggle Theme", self.toggle_theme))
+        profiling_action = view_menu.addAction("Log Slow Handlers")
+        profiling_action.setCheckable(True)
+        profiling_action.setChecked(self.stall_monitor.enabled)
+        profiling_action.toggled.connect(self.set_profiling)
 
         # Font Menu
         font_menu = menu_bar.addMenu("Font")
-        font_menu.addAction("Change Font", self.change_font_dialog)
+        font_menu.addAction("Change Font", timed("Change Font", self.change_font_dialog))
 
     def create_toolbar(self):
         toolbar = QToolBar("Formatting")
         self.addToolBar(toolbar)
+        timed = self.stall_monitor.timed
 
         bold_action = QAction("Bold", self)
-        bold_action.triggered.connect(self.toggle_bold)
+        bold_action.triggered.connect(timed("Bold", self.toggle_bold))
         toolbar.addAction(bold_action)
 
         italic_action = QAction("Italic", self)
-        italic_action.triggered.connect(self.toggle_italic)
+        italic_action.triggered.connect(timed("Italic", self.toggle_italic))
         toolbar.addAction(italic_action)
 
         underline_action = QAction("Underline", self)
-        underline_action.triggered.connect(self.toggle_underline)
+        underline_action.triggered.connect(timed("Underline", self.toggle_underline))
         toolbar.addAction(underline_action)
 
+    def set_profiling(self, enabled):
+        # Stalls over 50 ms are logged to the "notebook.profiling" logger
+        self.stall_monitor.set_enabled(enabled)
+        self.settings.setValue("profiling/enabled", enabled)
+
     def toggle_bold(self):
         editor = self.current_editor()
         fmt = QTextCharFormat()
-        weight = QFont.Bold if editor.fontWeight() != QFont.Bold else QFont.Normal
+        weight = QFont.Bold if editor.currentCharFormat().fontWeight() != QFont.Bold else QFont.Normal
         fmt.setFontWeight(weight)
         editor.mergeCurrentCharFormat(fmt)
 
     def toggle_italic(self):
         editor = self.current_editor()
         fmt = QTextCharFormat()
-        fmt.setFontItalic(not editor.fontItalic())
+        fmt.setFontItalic(not editor.currentCharFormat().fontItalic())
         editor.mergeCurrentCharFormat(fmt)
 
     def toggle_underline(self):
         editor = self.current_editor()
         fmt = QTextCharFormat()
-        fmt.setFontUnderline(not editor.fontUnderline())
+        fmt.setFontUnderline(not editor.currentCharFormat().fontUnderline())
         editor.mergeCurrentCharFormat(fmt)
 
+    def show_search_panel(self):
+        if self.search_panel is None:
+            self.search_panel = SearchPanel(self.store, self)
+            self.search_panel.note_activated.connect(self.open_path)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.search_panel)
+        self.search_panel.show()
+        self.search_panel.query_edit.setFocus()
+        self.search_panel.update_index()
+
+    def new_note(self):
+        title, ok = QInputDialog.getText(self, "New Note", "Title:")
+        if not ok or not title.strip():
+            return
+        tags, ok = QInputDialog.getText(self, "New Note", "Tags (comma-separated):")
+        if not ok:
+            return
+        try:
+            path = self.store.create(title.strip(), tags=tags)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to create note: {e}")
+            return
+        self.open_path(path)
+
     def open_file(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Open File", "", "Text Files (*.txt);;All Files (*)")
         if file_path:
-            try:
-                with open(file_path, "r", encoding="utf-8") as file:
-                    editor = TextEditor()
-                    editor.setText(file.read())
-                    editor.file_path = file_path
-                    index = self.tabs.addTab(editor, file_path.split("/")[-1])
-                    self.tabs.setCurrentIndex(index)
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to open file: {e}")
+            self.open_path(file_path)
+
+    def open_path(self, file_path):
+        # A second editor on the same file would auto-save over the first one's changes
+        index = self.find_tab(file_path)
+        if index >= 0:
+            self.tabs.setCurrentIndex(index)
+            return
+        try:
+            self.writer.reload(file_path)
+            editor = TextEditor()
+            threshold = self.settings.value("large_file_threshold", LARGE_FILE_THRESHOLD, type=int)
+            editor.load_file(file_path, threshold)
+            index = self.tabs.addTab(editor, file_path.split("/")[-1])
+            self.tabs.setCurrentIndex(index)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to open file: {e}")
 
     def save_file(self):
         editor = self.current_editor()
         file_path, _ = QFileDialog.getSaveFileName(self, "Save File", "", "Text Files (*.txt);;All Files (*)")
         if file_path:
             try:
-                with open(file_path, "w", encoding="utf-8") as file:
-                    file.write(editor.toPlainText())
+                self.writer.write_now(file_path, editor.toPlainText())
                 editor.file_path = file_path
+                editor.reset_tracking()
+                editor.update_highlighter()
                 self.tabs.setTabText(self.tabs.currentIndex(), file_path.split("/")[-1])
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to save file: {e}")
 
     def export_to_pdf(self):
-        from fpdf import FPDF
+        editor = self.current_editor()
         file_path, _ = QFileDialog.getSaveFileName(self, "Export to PDF", "", "PDF Files (*.pdf)")
         if file_path:
             try:
-                pdf = FPDF()
-                pdf.add_page()
-                pdf.set_font("Arial", size=12)
-                for line in self.current_editor().toPlainText().split("\n"):
-                    pdf.cell(200, 10, line.encode("latin-1", "replace").decode("latin-1"), ln=True)
-                pdf.output(file_path)
+                if (editor.file_path and not editor.is_loading() and not editor.is_dirty()
+                        and not self.writer.is_stale(editor.file_path)):
+                    self.writer.reload(editor.file_path)  # Fold auto-save journal into the file
+                    source_path, temp_source = editor.file_path, False
+                else:
+                    # Unsaved text goes through a temp file so the worker can stream it
+                    import tempfile
+
+                    with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".txt", delete=False) as file:
+                        file.write(editor.toPlainText())
+                    source_path, temp_source = file.name, True
+                from pdf_export import find_unicode_font
+
+                font_path = find_unicode_font(self.settings.value("pdf_font", None))
+                job = PdfExportJob(source_path, file_path, font_path, temp_source, self)
+                job.start()
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"PDF export failed: {e}")
 
     def find_text(self):
-        editor = self.current_editor()
-        search_text, ok = QInputDialog.getText(self, "Find Text", "Enter text to search:")
-        if ok and search_text:
-            cursor = editor.textCursor()
-            format = QTextCharFormat()
-            format.setBackground(Qt.yellow)
-            editor.moveCursor(QTextCursor.Start)
-            while editor.find(search_text):
-                cursor = editor.textCursor()
-                cursor.mergeCharFormat(format)
+        self.find_bar.open_bar(self.current_editor())
 
     def change_font_dialog(self):
         font, ok = QFontDialog.getFont()
         if ok:
             self.current_editor().setFont(font)
 
+    def closeEvent(self, event):
+        self.save_session()
+        for editor in self.editors():
+            editor.cancel_loading()
+        self.writer.close()
+        if self.search_panel is not None:
+            self.search_panel.stop()
+        self.find_bar.stop()
+        for job in self.findChildren(PdfExportJob):
+            job.stop()
+        super().closeEvent(event)
+
     def toggle_theme(self):
         new_theme = "styles/dark.css" if self.current_theme == "light" else "styles/light.css"
         self.apply_css(new_theme)
@@ -187,8 +1075,18 @@ class Notebook(QMainWindow):
         self.current_theme = "dark" if self.current_theme == "light" else "light"
 
 
+def print_startup_report():
+    STARTUP.mark("event loop running")
+    print(STARTUP.report(), file=sys.stderr)
+
+
 if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s %(name)s: %(message)s")
     app = QApplication(sys.argv)
+    STARTUP.mark("QApplication")
     window = Notebook()
     window.show()
+    STARTUP.mark("window shown")
+    if "--startup-report" in sys.argv or os.environ.get("NOTEBOOK_STARTUP_REPORT"):
+        QTimer.singleShot(0, print_startup_report)
     sys.exit(app.exec_())
\ No newline at end of file
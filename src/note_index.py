@@ -0,0 +1,229 @@
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+from collections import Counter, namedtuple
+from datetime import datetime
+
+NOTE_EXTENSIONS = (".txt",)
+HEADER_LINES = 10
+
+FILENAME_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2})_(.+?)(?:_([^_]+))?$")
+HEADER_PATTERN = re.compile(r"^(title|tags|date)\s*:\s*(.*)$", re.IGNORECASE)
+WORD_PATTERN = re.compile(r"\w+")
+
+SearchResult = namedtuple("SearchResult", "path title date tags")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    date TEXT NOT NULL,
+    tags TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_date ON notes(date);
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT NOT NULL,
+    note_id INTEGER NOT NULL,
+    PRIMARY KEY (tag, note_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    note_id INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (term, note_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_note ON postings(note_id);
+CREATE INDEX IF NOT EXISTS tags_note ON tags(note_id);
+"""
+
+
+def split_tags(value):
+    return [tag.strip().lower() for tag in re.split(r"[,\s]+", value) if tag.strip()]
+
+
+def default_index_path(notes_dir):
+    """Returns a per-user cache file for the index of notes_dir.
+
+    The index lives outside the notes folder: SQLite creates and deletes its
+    -wal and -shm files on every connection, which would otherwise wake the
+    GUI's folder watcher and trigger another update, forever.
+    """
+    if os.name == "nt":
+        cache_dir = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        cache_dir = os.path.expanduser("~/Library/Caches")
+    else:
+        cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    key = hashlib.blake2b(os.path.abspath(notes_dir).encode("utf-8"), digest_size=8).hexdigest()
+    return os.path.join(cache_dir, "notebook", f"index-{key}.sqlite3")
+
+
+def parse_note(path, text, mtime):
+    """Extracts title, date and tags from a note's filename and header lines.
+
+    Filenames follow "YYYY-MM-DD_Title_tag1,tag2.txt"; "Title:", "Date:" and
+    "Tags:" lines at the top of the file take precedence.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    title, date, tags = stem, datetime.fromtimestamp(mtime).strftime("%Y-%m-%d"), []
+    match = FILENAME_PATTERN.match(stem)
+    if match:
+        date, title = match.group(1), match.group(2).replace("-", " ")
+        if match.group(3):
+            tags = split_tags(match.group(3))
+
+    for line in text.split("\n", HEADER_LINES)[:HEADER_LINES]:
+        header = HEADER_PATTERN.match(line.strip())
+        if not header:
+            break
+        key, value = header.group(1).lower(), header.group(2).strip()
+        if key == "title" and value:
+            title = value
+        elif key == "date" and value:
+            date = value[:10]
+        elif key == "tags":
+            tags = split_tags(value)
+    return title.strip() or stem, date, sorted(set(tags))
+
+
+def parse_query(query):
+    """Splits a query into keywords and tag:/date:/after:/before: filters."""
+    terms, filters = [], {"tag": [], "date": None, "after": None, "before": None}
+    for token in query.split():
+        key, sep, value = token.partition(":")
+        key = key.lower()
+        if sep and key in filters and value:
+            if key == "tag":
+                filters["tag"].extend(split_tags(value))
+            else:
+                filters[key] = value
+        else:
+            terms.extend(WORD_PATTERN.findall(token.lower()))
+    return terms, filters
+
+
+class NoteIndex:
+    """Inverted index over a folder of notes, stored in an SQLite file in the user's cache."""
+
+    def __init__(self, notes_dir, index_path=None):
+        self.notes_dir = notes_dir
+        self.index_path = index_path or default_index_path(notes_dir)
+
+    def connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        conn = sqlite3.connect(self.index_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def scan(self):
+        for root, dirs, files in os.walk(self.notes_dir):
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            for name in files:
+                if name.endswith(NOTE_EXTENSIONS) and not name.startswith("."):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield os.path.abspath(path), stat.st_mtime, stat.st_size
+
+    def update(self):
+        """Re-indexes notes whose mtime or size changed and drops deleted ones.
+
+        Returns the number of notes added, changed or removed.
+        """
+        conn = self.connect()
+        try:
+            known = {path: (note_id, mtime, size)
+                     for note_id, path, mtime, size in conn.execute("SELECT id, path, mtime, size FROM notes")}
+            changes = 0
+            with conn:
+                for path, mtime, size in self.scan():
+                    entry = known.pop(path, None)
+                    if entry is not None and entry[1:] == (mtime, size):
+                        continue
+                    try:
+                        with open(path, "r", encoding="utf-8", errors="replace") as file:
+                            text = file.read()
+                    except OSError:
+                        continue
+                    if entry is not None:
+                        self.remove(conn, entry[0])
+                    self.add(conn, path, mtime, size, text)
+                    changes += 1
+                for note_id, _, _ in known.values():
+                    self.remove(conn, note_id)
+                    changes += 1
+            return changes
+        finally:
+            conn.close()
+
+    def add(self, conn, path, mtime, size, text):
+        title, date, tags = parse_note(path, text, mtime)
+        cursor = conn.execute(
+            "INSERT INTO notes (path, mtime, size, title, date, tags) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, mtime, size, title, date, ",".join(tags)),
+        )
+        note_id = cursor.lastrowid
+        words = Counter(WORD_PATTERN.findall(text.lower()))
+        words.update(WORD_PATTERN.findall(title.lower()))
+        words.update(tags)
+        conn.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                         ((term, note_id, count) for term, count in words.items()))
+        conn.executemany("INSERT INTO tags VALUES (?, ?)", ((tag, note_id) for tag in tags))
+
+    def remove(self, conn, note_id):
+        conn.execute("DELETE FROM postings WHERE note_id = ?", (note_id,))
+        conn.execute("DELETE FROM tags WHERE note_id = ?", (note_id,))
+        conn.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+
+    def search(self, query="", tags=(), after=None, before=None, limit=200):
+        """Returns notes matching every keyword and filter, best matches first; limit=None returns all."""
+        terms, filters = parse_query(query)
+        tags = list(tags) + filters["tag"]
+        after = after or filters["after"]
+        before = before or filters["before"]
+
+        clauses, params = [], []
+        for term in terms:
+            clauses.append("n.id IN (SELECT note_id FROM postings WHERE term = ?)")
+            params.append(term)
+        for tag in tags:
+            clauses.append("n.id IN (SELECT note_id FROM tags WHERE tag = ?)")
+            params.append(tag.lower())
+        if filters["date"]:
+            clauses.append("n.date LIKE ?")
+            params.append(filters["date"] + "%")
+        if after:
+            clauses.append("n.date >= ?")
+            params.append(after)
+        if before:
+            clauses.append("n.date <= ?")
+            params.append(before)
+
+        if terms:
+            placeholders = ",".join("?" * len(terms))
+            score = f"(SELECT SUM(count) FROM postings WHERE note_id = n.id AND term IN ({placeholders}))"
+            order = f"{score} DESC, n.date DESC"
+            order_params = terms
+        else:
+            order, order_params = "n.date DESC, n.path", []
+        sql = "SELECT n.path, n.title, n.date, n.tags FROM notes n"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order} LIMIT ?"
+
+        conn = self.connect()
+        try:
+            rows = conn.execute(sql, params + order_params + [-1 if limit is None else limit]).fetchall()
+        finally:
+            conn.close()
+        return [SearchResult(path, title, date, [tag for tag in note_tags.split(",") if tag])
+                for path, title, date, note_tags in rows]
@@ -0,0 +1,160 @@
+import os
+import re
+from datetime import date as Date
+
+# Next to the scripts, as in the README, so the GUI and CLI agree wherever they are started from
+NOTES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "notes")
+IMPORT_BATCH_SIZE = 500
+IMPORT_WORKERS = 16
+
+SLUG_PATTERN = re.compile(r"[\W_]+")  # "_" separates the fields of a filename
+
+
+def slugify(text):
+    return SLUG_PATTERN.sub("-", text).strip("-") or "note"
+
+
+def note_filename(title, tags=(), date=None):
+    """Builds "YYYY-MM-DD_Title_tag1,tag2.txt" as described in the README."""
+    name = f"{date or Date.today().isoformat()}_{slugify(title)}"
+    tags = [slugify(tag).lower() for tag in tags if tag.strip()]
+    if tags:
+        name += "_" + ",".join(tags)
+    return name + ".txt"
+
+
+def note_header(title, tags=(), date=None):
+    # Always write Tags, even empty, so the header rather than the filename decides
+    lines = [f"Title: {title}", f"Tags: {', '.join(tags)}".rstrip(), f"Date: {date or Date.today().isoformat()}"]
+    return "\n".join(lines) + "\n\n"
+
+
+def parse_tags(value):
+    if isinstance(value, str):
+        value = value.split(",")
+    return [tag.strip() for tag in value or () if tag.strip()]
+
+
+def write_new(path, text):
+    with open(path, "x", encoding="utf-8") as file:
+        file.write(text)
+    return path
+
+
+def read_text(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        return file.read()
+
+
+class NoteStore:
+    """Qt-free access to the notes folder, shared by the GUI and the CLI.
+
+    Listing and searching go through the note index, which only re-reads files
+    whose mtime changed; sqlite3 and thread pools are imported on first use so
+    the CLI starts quickly.
+    """
+
+    def __init__(self, root=NOTES_DIR):
+        self.root = root
+        self._index = None
+
+    def index(self):
+        if self._index is None:
+            from note_index import NoteIndex
+
+            self._index = NoteIndex(self.root)
+        return self._index
+
+    def create(self, title, body="", tags=(), date=None):
+        """Creates a note and returns its path; never overwrites an existing note."""
+        tags = parse_tags(tags)
+        os.makedirs(self.root, exist_ok=True)
+        path = self.unique_path(note_filename(title, tags, date), set())
+        return write_new(path, note_header(title, tags, date) + body)
+
+    def unique_path(self, filename, taken):
+        stem, ext = os.path.splitext(filename)
+        candidate, number = filename, 1
+        while candidate in taken or os.path.exists(os.path.join(self.root, candidate)):
+            number += 1
+            candidate = f"{stem}-{number}{ext}"
+        taken.add(candidate)
+        return os.path.join(self.root, candidate)
+
+    def find(self, title_or_path):
+        """Resolves a path, or the newest note whose title matches, to a path."""
+        if os.path.isfile(title_or_path):
+            return title_or_path
+        wanted = title_or_path.strip().lower()
+        for note in self.list():
+            if note.title.lower() == wanted or os.path.basename(note.path).lower() == wanted:
+                return note.path
+        raise FileNotFoundError(f"No note titled {title_or_path!r} in {self.root}")
+
+    def append(self, title_or_path, text):
+        path = self.find(title_or_path)
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(text if text.startswith("\n") else "\n" + text)
+        return path
+
+    def list(self, tag=None):
+        """Returns every note, newest first, optionally only those with a tag."""
+        index = self.index()
+        index.update()
+        return index.search(tags=[tag] if tag else (), limit=None)
+
+    def search(self, query="", tags=(), after=None, before=None, limit=200):
+        index = self.index()
+        index.update()
+        return index.search(query, tags=tags, after=after, before=before, limit=limit)
+
+    def bulk_create(self, notes, workers=IMPORT_WORKERS, batch_size=IMPORT_BATCH_SIZE):
+        """Creates many notes at once from (title, body, tags, date) tuples.
+
+        Filenames are allocated up front against a single directory listing,
+        then batches of files are written concurrently. Returns the new paths.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        os.makedirs(self.root, exist_ok=True)
+        taken = set(os.listdir(self.root))
+        jobs = []
+        for title, body, tags, date in notes:
+            tags = parse_tags(tags)
+            path = self.unique_path(note_filename(title, tags, date), taken)
+            jobs.append((path, note_header(title, tags, date) + (body or "")))
+
+        def write_batch(batch):
+            return [write_new(path, text) for path, text in batch]
+
+        batches = [jobs[offset:offset + batch_size] for offset in range(0, len(jobs), batch_size)]
+        paths = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for written in pool.map(write_batch, batches):
+                paths.extend(written)
+        return paths
+
+    def import_files(self, sources, tags=(), workers=IMPORT_WORKERS, batch_size=IMPORT_BATCH_SIZE):
+        """Imports text files, or folders of them, as notes titled after each file."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        files = []
+        for source in sources:
+            if os.path.isdir(source):
+                files.extend(os.path.join(root, name)
+                             for root, _, names in os.walk(source) for name in sorted(names)
+                             if name.endswith(".txt"))
+            else:
+                files.append(source)
+
+        def read_batch(batch):
+            return [read_text(path) for path in batch]
+
+        batches = [files[offset:offset + batch_size] for offset in range(0, len(files), batch_size)]
+        bodies = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for texts in pool.map(read_batch, batches):
+                bodies.extend(texts)
+        notes = [(os.path.splitext(os.path.basename(path))[0], body, tags, None)
+                 for path, body in zip(files, bodies)]
+        return self.bulk_create(notes, workers, batch_size)
@@ -0,0 +1,140 @@
+import argparse
+import os
+import subprocess
+import sys
+
+from note_store import IMPORT_WORKERS, NOTES_DIR, NoteStore
+
+
+def print_notes(notes):
+    for note in notes:
+        tags = f"  [{', '.join(note.tags)}]" if note.tags else ""
+        print(f"{note.date}  {note.title}{tags}  {note.path}")
+
+
+def read_input(text):
+    """Returns text from the command line, or from stdin when it is piped in."""
+    if text is not None:
+        return text
+    if not sys.stdin.isatty():
+        return sys.stdin.read()
+    return None
+
+
+def open_in_editor(path):
+    editor = os.environ.get("VISUAL") or os.environ.get("EDITOR") or ("notepad" if os.name == "nt" else "vi")
+    return subprocess.call([editor, path])
+
+
+def cmd_new(args):
+    body = read_input(args.body)
+    path = NoteStore(args.dir).create(args.title, body or "", args.tags, args.date)
+    print(path)
+    if body is None:
+        return open_in_editor(path)
+    return 0
+
+
+def cmd_edit(args):
+    store = NoteStore(args.dir)
+    text = read_input(args.text)
+    if text is None:
+        return open_in_editor(store.find(args.title))
+    print(store.append(args.title, text))
+    return 0
+
+
+def cmd_list(args):
+    print_notes(NoteStore(args.dir).list(args.tag))
+    return 0
+
+
+def cmd_search(args):
+    results = NoteStore(args.dir).search(" ".join(args.query), tags=args.tag, after=args.after,
+                                         before=args.before, limit=args.limit)
+    print_notes(results)
+    return 0 if results else 1
+
+
+def cmd_import(args):
+    paths = NoteStore(args.dir).import_files(args.sources, args.tags, workers=args.jobs)
+    print(f"Imported {len(paths)} notes into {args.dir}")
+    return 0
+
+
+def cmd_export_pdf(args):
+    # fpdf is only needed here, so keep it out of the other subcommands' startup
+    from pdf_export import export_folder, export_pdf, find_unicode_font
+
+    if os.path.isfile(args.source):
+        output = args.out or os.path.splitext(args.source)[0] + ".pdf"
+        export_pdf(args.source, output, find_unicode_font(args.font))
+        print(output)
+        return 0
+
+    failures = 0
+    for source, output, error in export_folder(args.source, args.out, args.font, args.jobs):
+        if error:
+            failures += 1
+            print(f"{source}: {error}", file=sys.stderr)
+        else:
+            print(output)
+    return 1 if failures else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="notebook.py", description="Manage plain-text notes.")
+    parser.add_argument("--dir", default=NOTES_DIR, help="notes folder (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    new = commands.add_parser("new", help="create a new note")
+    new.add_argument("--title", required=True)
+    new.add_argument("--tags", default="", help="comma-separated tags")
+    new.add_argument("--date", help="note date as YYYY-MM-DD (default: today)")
+    new.add_argument("--body", help="note text (default: stdin if piped, otherwise open $EDITOR)")
+    new.set_defaults(func=cmd_new)
+
+    edit = commands.add_parser("edit", help="append to or edit an existing note")
+    edit.add_argument("--title", required=True, help="note title or path")
+    edit.add_argument("--text", help="text to append (default: stdin if piped, otherwise open $EDITOR)")
+    edit.set_defaults(func=cmd_edit)
+
+    list_notes = commands.add_parser("list", help="list notes, newest first")
+    list_notes.add_argument("--tag", help="only notes with this tag")
+    list_notes.set_defaults(func=cmd_list)
+
+    search = commands.add_parser("search", help="search notes by keywords, tags or dates")
+    search.add_argument("--query", "-q", nargs="*", default=[],
+                        help="keywords; also accepts tag:NAME, date:YYYY-MM, after:DATE, before:DATE")
+    search.add_argument("--tag", "-t", action="append", default=[], help="only notes with this tag")
+    search.add_argument("--after", help="only notes dated on or after YYYY-MM-DD")
+    search.add_argument("--before", help="only notes dated on or before YYYY-MM-DD")
+    search.add_argument("--limit", type=int, default=200)
+    search.set_defaults(func=cmd_search)
+
+    bulk = commands.add_parser("import", help="import text files or folders of them as notes")
+    bulk.add_argument("sources", nargs="+")
+    bulk.add_argument("--tags", default="", help="comma-separated tags for every imported note")
+    bulk.add_argument("--jobs", "-j", type=int, default=IMPORT_WORKERS, help="concurrent file workers")
+    bulk.set_defaults(func=cmd_import)
+
+    export = commands.add_parser("export-pdf", help="export a note, or every note in a folder, to PDF")
+    export.add_argument("source", help="note file or folder of notes")
+    export.add_argument("--out", "-o", help="output file, or output folder for a batch (default: next to the notes)")
+    export.add_argument("--jobs", "-j", type=int, help="parallel export processes (default: one per CPU)")
+    export.add_argument("--font", help="Unicode TTF font to embed")
+    export.set_defaults(func=cmd_export_pdf)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except OSError as e:
+        print(f"notebook.py: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import os
+
+FONT_FAMILY = "NoteFont"
+FONT_SIZE = 12
+LINE_HEIGHT = 6
+PROGRESS_EVERY = 200  # Lines between progress reports and cancellation checks
+
+# Common locations of TTF fonts with broad Unicode coverage
+FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+    "/usr/share/fonts/noto/NotoSans-Regular.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arialuni.ttf",
+    "C:\\Windows\\Fonts\\segoeui.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+)
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def wrap_line(text, max_width, string_width):
+    """Splits one line into pieces no wider than max_width, breaking at spaces where possible."""
+    if string_width(text) <= max_width:
+        return [text]
+    pieces = []
+    current, current_width = "", 0.0
+    space_width = string_width(" ")
+    for word in text.split(" "):
+        word_width = string_width(word)
+        extra = space_width if current else 0.0
+        if current_width + extra + word_width <= max_width:
+            current += (" " if current else "") + word
+            current_width += extra + word_width
+            continue
+        if current:
+            pieces.append(current)
+            current, current_width = "", 0.0
+        # A word wider than the line is broken between characters
+        while word_width > max_width and len(word) > 1:
+            low, high = 1, len(word) - 1
+            while low < high:  # Longest prefix that fits, at least one character
+                middle = (low + high + 1) // 2
+                if string_width(word[:middle]) <= max_width:
+                    low = middle
+                else:
+                    high = middle - 1
+            pieces.append(word[:low])
+            word = word[low:]
+            word_width = string_width(word)
+        current, current_width = word, word_width
+    pieces.append(current)
+    return pieces
+
+
+def find_unicode_font(preferred=None):
+    """Returns the first usable Unicode TTF font, or None to fall back to a Latin-1 core font."""
+    for path in (preferred,) + FONT_CANDIDATES:
+        if path and os.path.isfile(path):
+            return path
+    return None
+
+
+def export_pdf(source_path, output_path, font_path=None, progress=None, cancelled=None):
+    """Renders a UTF-8 text file to PDF, wrapping long lines.
+
+    The source is read line by line so it is never held in memory as a whole.
+    progress(done_bytes, total_bytes) is called periodically; when cancelled()
+    returns true the export stops with ExportCancelled and no output is written.
+    """
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+    # Only calls that both fpdf 1.7 (the version in venv/) and fpdf2 accept
+    if font_path:
+        pdf.add_font(FONT_FAMILY, "", font_path, uni=True)
+        pdf.set_font(FONT_FAMILY, size=FONT_SIZE)
+    else:
+        pdf.set_font("Helvetica", size=FONT_SIZE)
+
+    # multi_cell() re-measures its text glyph by glyph and is roughly ten times
+    # slower, so lines are wrapped here and written with one cell() each
+    max_width = pdf.w - pdf.l_margin - pdf.r_margin
+    char_widths = {}
+
+    def char_width(char):
+        width = char_widths.get(char)
+        if width is None:
+            width = char_widths[char] = pdf.get_string_width(char)
+        return width
+
+    def string_width(text):
+        # Without text shaping a string is exactly as wide as its characters
+        return sum(map(char_width, text))
+
+    total = os.path.getsize(source_path)
+    done = 0
+    with open(source_path, "rb") as file:
+        for number, raw in enumerate(file, 1):
+            done += len(raw)
+            text = raw.decode("utf-8", "replace").rstrip("\r\n").expandtabs(4)
+            if not font_path:
+                text = text.encode("latin-1", "replace").decode("latin-1")
+            for piece in wrap_line(text, max_width, string_width):
+                pdf.cell(0, LINE_HEIGHT, piece, ln=1)
+            if number % PROGRESS_EVERY == 0:
+                if cancelled is not None and cancelled():
+                    raise ExportCancelled()
+                if progress is not None:
+                    progress(done, total)
+    pdf.output(output_path)
+    if progress is not None:
+        progress(total, total)
+
+
+def export_worker(source_path, output_path, font_path, messages, cancel_event):
+    """Entry point for the export process; reports over a multiprocessing queue."""
+    try:
+        export_pdf(source_path, output_path, font_path,
+                   progress=lambda done, total: messages.put(("progress", done, total)),
+                   cancelled=cancel_event.is_set)
+        messages.put(("done", output_path, None))
+    except ExportCancelled:
+        messages.put(("cancelled", output_path, None))
+    except Exception as e:
+        messages.put(("error", output_path, str(e)))
+
+
+def export_one(source_path, output_path, font_path):
+    try:
+        export_pdf(source_path, output_path, font_path)
+        return source_path, output_path, None
+    except Exception as e:
+        return source_path, output_path, str(e)
+
+
+def export_folder(source_dir, output_dir=None, font_path=None, jobs=None, extensions=(".txt",)):
+    """Exports every note in source_dir to PDF across a pool of processes.
+
+    Yields (source, output, error) as each note finishes; error is None on success.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    output_dir = output_dir or source_dir
+    font_path = find_unicode_font(font_path)
+    os.makedirs(output_dir, exist_ok=True)
+    notes = sorted(name for name in os.listdir(source_dir)
+                   if name.endswith(extensions) and os.path.isfile(os.path.join(source_dir, name)))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(export_one, os.path.join(source_dir, name),
+                        os.path.join(output_dir, os.path.splitext(name)[0] + ".pdf"), font_path)
+            for name in notes
+        ]
+        for future in as_completed(futures):
+            yield future.result()
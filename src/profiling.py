@@ -0,0 +1,74 @@
+import logging
+import time
+
+from PyQt5.QtCore import QObject, Qt, QTimer
+
+STALL_THRESHOLD = 0.05  # Seconds the event loop may be blocked before it is logged
+HEARTBEAT_INTERVAL = 10  # Milliseconds
+
+logger = logging.getLogger("notebook.profiling")
+
+
+class StallMonitor(QObject):
+    """Opt-in logging of anything that blocks the event loop for too long.
+
+    A heartbeat timer notices every stall, including ones inside Qt itself,
+    such as relayouts. Handlers wrapped with timed() are also logged by name,
+    so most stalls can be traced back to the menu action or timer behind them.
+    The heartbeat only runs while the monitor is enabled.
+    """
+
+    def __init__(self, threshold=STALL_THRESHOLD, interval=HEARTBEAT_INTERVAL, parent=None):
+        super().__init__(parent)
+        self.threshold = threshold
+        self.interval = interval
+        self.enabled = False
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setTimerType(Qt.PreciseTimer)
+        self.heartbeat.setInterval(interval)
+        self.heartbeat.timeout.connect(self.beat)
+        self.reset()
+
+    def reset(self):
+        self.last_beat = time.perf_counter()
+        self.reported_until = 0.0
+        self.max_stall = 0.0
+        self.total_stall = 0.0
+        self.stalls = 0
+        self.beats = 0
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if enabled:
+            self.last_beat = time.perf_counter()
+            self.heartbeat.start()
+        else:
+            self.heartbeat.stop()
+
+    def beat(self):
+        now = time.perf_counter()
+        stall = now - self.last_beat - self.interval / 1000
+        self.max_stall = max(self.max_stall, stall)
+        if stall > self.threshold:
+            self.total_stall += stall
+            self.stalls += 1
+            # Skip stalls that a timed() handler has already reported by name
+            if self.reported_until < self.last_beat:
+                logger.warning("Event loop blocked for %.0f ms", stall * 1000)
+        self.last_beat = now
+        self.beats += 1
+
+    def timed(self, name, handler):
+        """Wraps a no-argument handler so slow calls are logged while enabled."""
+        def run():
+            if not self.enabled:
+                return handler()
+            start = time.perf_counter()
+            try:
+                return handler()
+            finally:
+                elapsed = time.perf_counter() - start
+                if elapsed > self.threshold:
+                    logger.warning("%s blocked the event loop for %.0f ms", name, elapsed * 1000)
+                    self.reported_until = time.perf_counter()
+        return run
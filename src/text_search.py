@@ -0,0 +1,35 @@
+import re
+from bisect import bisect_left
+
+MATCH_BATCH_SIZE = 20000
+ASTRAL_PATTERN = re.compile("[\U00010000-\U0010FFFF]")
+
+
+def compile_pattern(text, regex=False, case_sensitive=False):
+    """Builds the search pattern; raises re.error for an invalid regex."""
+    flags = 0 if case_sensitive else re.IGNORECASE
+    return re.compile(text if regex else re.escape(text), flags | re.MULTILINE)
+
+
+def iter_match_batches(text, pattern, batch_size=MATCH_BATCH_SIZE):
+    """Scans text once, yielding (starts, ends) lists in Qt document positions.
+
+    Qt counts positions in UTF-16 code units, so characters outside the BMP
+    shift every later match by one; plain BMP text skips the adjustment.
+    """
+    astral = [m.start() for m in ASTRAL_PATTERN.finditer(text)] if not text.isascii() else []
+    starts, ends = [], []
+    for match in pattern.finditer(text):
+        start, end = match.span()
+        if start == end:
+            continue
+        if astral:
+            start += bisect_left(astral, start)
+            end += bisect_left(astral, end)
+        starts.append(start)
+        ends.append(end)
+        if len(starts) >= batch_size:
+            yield starts, ends
+            starts, ends = [], []
+    if starts:
+        yield starts, ends
@@ -0,0 +1,243 @@
+import os
+import random
+import threading
+
+import pytest
+
+import autosave
+from autosave import JOURNAL_SUFFIX, JournalWriter, read_lines, recover_journal
+
+
+def write_file(path, lines):
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        file.write("\n".join(lines))
+
+
+def changed_range(old, new):
+    """Returns (start, end, replacement) turning old into new, like the editor's dirty range."""
+    start = 0
+    while start < min(len(old), len(new)) and old[start] == new[start]:
+        start += 1
+    tail = 0
+    while tail < min(len(old), len(new)) - start and old[-1 - tail] == new[-1 - tail]:
+        tail += 1
+    return start, len(old) - tail, new[start:len(new) - tail]
+
+
+def random_edit(rng, lines):
+    lines = list(lines)
+    start = rng.randrange(len(lines) + 1)
+    end = min(len(lines), start + rng.randrange(4))
+    lines[start:end] = [f"edit {rng.random():.6f}" for _ in range(rng.randrange(4))]
+    return lines or [""]
+
+
+@pytest.fixture
+def writer():
+    errors = []
+    writer = JournalWriter(on_error=lambda path, message: errors.append((path, message)))
+    writer.errors = errors
+    yield writer
+    writer.close()
+
+
+def test_patches_replay_to_editor_text(tmp_path, writer):
+    path = str(tmp_path / "note.txt")
+    text = [f"line {number}" for number in range(30)]
+    write_file(path, text)
+    writer.reload(path)
+    rng = random.Random(7)
+    # Enough patches to compact the journal into the file at least once
+    for _ in range(autosave.COMPACT_AFTER_ENTRIES + 20):
+        edited = random_edit(rng, text)
+        writer.submit_patch(path, *changed_range(text, edited))
+        text = edited
+        writer.queue.join()
+        assert read_lines(path) == text
+    writer.flush()
+    assert not os.path.exists(path + JOURNAL_SUFFIX)
+    with open(path, encoding="utf-8") as file:
+        assert file.read() == "\n".join(text)
+    assert writer.errors == []
+
+
+def test_torn_journal_entry_is_ignored_on_recovery(tmp_path):
+    path = str(tmp_path / "note.txt")
+    write_file(path, ["a", "b", "c"])
+    with open(path + JOURNAL_SUFFIX, "w", encoding="utf-8") as journal:
+        journal.write('{"start": 1, "end": 2, "lines": ["B"]}\n')
+        journal.write('{"start": 0, "end": 1, "li')  # Crash mid-append
+    assert read_lines(path) == ["a", "B", "c"]
+    recover_journal(path)
+    assert not os.path.exists(path + JOURNAL_SUFFIX)
+    with open(path, encoding="utf-8") as file:
+        assert file.read() == "a\nB\nc"
+
+
+def test_missing_file_reads_as_one_empty_line(tmp_path):
+    assert read_lines(str(tmp_path / "missing.txt")) == [""]
+
+
+def test_write_now_replaces_file_and_journal(tmp_path, writer):
+    path = str(tmp_path / "note.txt")
+    write_file(path, ["a", "b"])
+    writer.reload(path)
+    writer.submit_patch(path, 0, 1, ["A"])
+    writer.write_now(path, "x\ny")
+    assert not os.path.exists(path + JOURNAL_SUFFIX)
+    assert read_lines(path) == ["x", "y"]
+
+
+def test_failed_patch_marks_path_stale_until_full_write(tmp_path, writer):
+    path = str(tmp_path / "note.txt")
+    text = [f"line{number}" for number in range(1, 10)]
+    write_file(path, text)
+    writer.reload(path)
+    writer.submit_patch(path, 0, 1, ["first"])
+    writer.queue.join()
+
+    os.remove(path + JOURNAL_SUFFIX)
+    os.mkdir(path + JOURNAL_SUFFIX)  # Journal appends now fail
+    writer.submit_patch(path, 3, 3, ["A1", "A2"])
+    writer.queue.join()
+    assert writer.is_stale(path)
+    assert writer.errors
+
+    os.rmdir(path + JOURNAL_SUFFIX)
+    # A patch against the editor's view of the file must not be applied to a different base
+    writer.submit_patch(path, 5, 6, ["Bline4"])
+    writer.queue.join()
+    assert writer.is_stale(path)
+    assert not os.path.exists(path + JOURNAL_SUFFIX)
+
+    editor_text = ["first", "line2", "line3", "A1", "A2", "Bline4", "line5", "line6", "line7", "line8", "line9"]
+    writer.submit_write(path, "\n".join(editor_text))
+    writer.queue.join()
+    assert not writer.is_stale(path)
+    assert read_lines(path) == editor_text
+
+
+def test_deleted_file_is_not_patched(tmp_path, writer):
+    path = str(tmp_path / "note.txt")
+    write_file(path, ["a", "b", "c"])
+    writer.reload(path)
+    writer.submit_patch(path, 0, 1, ["A"])
+    writer.queue.join()
+
+    os.remove(path)
+    writer.submit_patch(path, 1, 2, ["B"])
+    writer.queue.join()
+    assert writer.is_stale(path)
+    assert writer.errors
+    # Replaying the journal would recreate the file as just the patched lines
+    assert not os.path.exists(path)
+    assert not os.path.exists(path + JOURNAL_SUFFIX)
+
+    writer.submit_write(path, "A\nB\nc")
+    writer.queue.join()
+    assert not writer.is_stale(path)
+    assert read_lines(path) == ["A", "B", "c"]
+
+
+def test_file_rewritten_by_another_program_is_not_patched(tmp_path, writer):
+    path = str(tmp_path / "note.txt")
+    write_file(path, ["a", "b", "c"])
+    writer.reload(path)
+    writer.submit_patch(path, 0, 1, ["A"])
+    writer.queue.join()
+
+    write_file(path, ["other", "program", "text", "here"])
+    writer.submit_patch(path, 2, 3, ["C"])
+    writer.queue.join()
+    assert writer.is_stale(path)
+    assert not os.path.exists(path + JOURNAL_SUFFIX)
+    assert read_lines(path) == ["other", "program", "text", "here"]
+
+    writer.submit_write(path, "A\nb\nC")
+    writer.queue.join()
+    assert read_lines(path) == ["A", "b", "C"]
+    # Later patches apply again once the editor's text is back on disk
+    writer.submit_patch(path, 1, 2, ["B"])
+    writer.flush()
+    assert not writer.is_stale(path)
+    assert read_lines(path) == ["A", "B", "C"]
+
+
+def test_patch_for_a_file_that_was_never_opened_is_dropped(tmp_path, writer):
+    path = str(tmp_path / "note.txt")
+    write_file(path, ["a"])
+    writer.submit_patch(path, 0, 1, ["A"])
+    writer.queue.join()
+    assert writer.is_stale(path)
+    assert read_lines(path) == ["a"]
+
+
+def test_snapshot_sees_baseline_then_every_save(tmp_path):
+    path = str(tmp_path / "note.txt")
+    write_file(path, ["a", "b"])
+    snapshots = []
+    writer = JournalWriter(snapshot=lambda snapshot_path, text: snapshots.append(text))
+    try:
+        writer.reload(path)
+        writer.submit_patch(path, 1, 2, ["B"])
+        writer.write_now(path, "c")
+    finally:
+        writer.close()
+    assert snapshots == ["a\nb", "a\nB", "c"]
+
+
+def test_write_now_does_not_wait_for_the_snapshot(tmp_path):
+    path = str(tmp_path / "note.txt")
+    release = threading.Event()
+    snapshots = []
+
+    def slow_snapshot(snapshot_path, text):
+        release.wait(10)
+        snapshots.append(text)
+
+    writer = JournalWriter(snapshot=slow_snapshot)
+    try:
+        writer.write_now(path, "saved")
+        assert read_lines(path) == ["saved"]
+        assert snapshots == []
+        release.set()
+        writer.flush()
+        assert snapshots == ["saved"]
+    finally:
+        release.set()
+        writer.close()
+
+
+def test_files_over_the_size_cap_get_no_history(tmp_path):
+    path = str(tmp_path / "note.txt")
+    write_file(path, ["a" * 20, "b"])
+    snapshots = []
+    writer = JournalWriter(snapshot=lambda snapshot_path, text: snapshots.append(text), snapshot_max_bytes=16)
+    try:
+        writer.reload(path)
+        writer.submit_patch(path, 1, 2, ["B"])
+        writer.write_now(path, "c" * 30)
+        writer.write_now(path, "small")
+        writer.submit_patch(path, 0, 1, ["SMALL"])
+    finally:
+        writer.close()
+    assert read_lines(path) == ["SMALL"]
+    # The first patch after a write snapshots its baseline again; HistoryStore skips the duplicate
+    assert snapshots == ["small", "small", "SMALL"]
+
+
+def test_snapshot_failure_does_not_fail_the_save(tmp_path):
+    path = str(tmp_path / "note.txt")
+    write_file(path, ["a"])
+    errors = []
+
+    def broken_snapshot(snapshot_path, text):
+        raise RuntimeError("history is broken")
+
+    writer = JournalWriter(on_error=lambda error_path, message: errors.append(message), snapshot=broken_snapshot)
+    try:
+        writer.write_now(path, "b")
+    finally:
+        writer.close()
+    assert read_lines(path) == ["b"]
+    assert errors and "history is broken" in errors[0]
@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+import history
+from history import HistoryStore, split_chunks, split_groups
+
+
+def make_text(lines, seed=1):
+    rng = random.Random(seed)
+    return "".join(f"{number} {rng.random():.12f} some note text\n" for number in range(lines))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / "history.sqlite3"))
+
+
+def chunk_count(store):
+    return store.connection().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+
+def test_split_chunks_reassembles_and_respects_bounds():
+    data = make_text(5000).encode("utf-8") + b"x" * (3 * history.CHUNK_MAX_BYTES) + b"\ntail"
+    chunks = split_chunks(data)
+    assert b"".join(chunks) == data
+    assert max(map(len, chunks)) <= history.CHUNK_MAX_BYTES
+    assert all(len(chunk) >= history.CHUNK_MIN_BYTES for chunk in chunks[:-1] if chunk.endswith(b"\n"))
+
+
+def test_split_chunks_keeps_chunks_away_from_an_edit():
+    old = make_text(5000).encode("utf-8")
+    new = old.replace(b"2500 ", b"2500 edited ", 1)
+    unchanged = set(split_chunks(old)) & set(split_chunks(new))
+    assert len(unchanged) >= len(split_chunks(old)) - 2
+
+
+def test_split_groups_keeps_every_hash_in_order():
+    hashes = [history.digest(str(number).encode()) for number in range(1000)]
+    assert b"".join(split_groups(hashes)) == b"".join(hashes)
+
+
+@pytest.mark.parametrize("text", ["", "one line", "ünïcödé ✓\r\nwindows\n", make_text(20000)])
+def test_record_load_round_trip(store, text):
+    version = store.record("note.txt", text)
+    assert store.load(version) == text
+
+
+def test_unchanged_text_is_not_recorded_again(store):
+    first = store.record("note.txt", "same")
+    assert store.record("note.txt", "same") is None
+    assert [version.id for version in store.versions("note.txt")] == [first]
+
+
+def test_versions_are_per_path_and_newest_first(store):
+    first = store.record("a.txt", "one")
+    second = store.record("a.txt", "two")
+    store.record("b.txt", "other")
+    versions = store.versions("a.txt")
+    assert [version.id for version in versions] == [second, first]
+    assert [version.size for version in versions] == [3, 3]
+
+
+def test_edit_reuses_most_chunks(store):
+    text = make_text(20000)
+    store.record("note.txt", text)
+    before = chunk_count(store)
+    edited = text.replace("10000 ", "10000 edited ", 1)
+    version = store.record("note.txt", edited)
+    assert store.load(version) == edited
+    assert chunk_count(store) - before <= 6
+
+
+def test_diff_between_versions(store):
+    old = store.record("note.txt", "a\nb\nc\n")
+    new = store.record("note.txt", "a\nB\nc\n")
+    diff = store.diff(old, new)
+    assert f"--- version {old}" in diff
+    assert "-b\n+B\n" in diff
+    assert store.diff(old, old) == ""
+
+
+def test_load_unknown_version_raises(store):
+    with pytest.raises(KeyError):
+        store.load(12345)
@@ -0,0 +1,90 @@
+import os
+import time
+
+import pytest
+
+from note_index import NoteIndex, default_index_path, parse_note, parse_query, split_tags
+
+MTIME = time.mktime((2024, 3, 5, 12, 0, 0, 0, 0, -1))
+
+
+def test_parse_note_reads_filename_fields():
+    assert parse_note("/notes/2025-06-01_Project-Ideas_python,cli.txt", "Body text", MTIME) == (
+        "Project Ideas", "2025-06-01", ["cli", "python"])
+
+
+def test_parse_note_header_wins_over_filename():
+    text = "Title: Real title\nTags: a, B c\nDate: 2025-07-08T10:00\n\nBody"
+    assert parse_note("/notes/2025-06-01_Other_x.txt", text, MTIME) == ("Real title", "2025-07-08", ["a", "b", "c"])
+
+
+def test_parse_note_empty_tags_header_clears_filename_tags():
+    text = "Title: snake_case tips\nTags:\nDate: 2025-06-01\n\n"
+    assert parse_note("/notes/2025-06-01_snake_case-tips.txt", text, MTIME)[2] == []
+
+
+def test_parse_note_falls_back_to_stem_and_mtime():
+    assert parse_note("/notes/scratch.txt", "just text\nTitle: not a header", MTIME) == (
+        "scratch", "2024-03-05", [])
+
+
+def test_parse_query_splits_keywords_and_filters():
+    terms, filters = parse_query("Python tag:CLI,tools date:2025-06 after:2025-01-01 before:2025-12-31 re-use")
+    assert terms == ["python", "re", "use"]
+    assert filters == {"tag": ["cli", "tools"], "date": "2025-06", "after": "2025-01-01", "before": "2025-12-31"}
+
+
+def test_parse_query_treats_unknown_or_empty_filters_as_keywords():
+    terms, filters = parse_query("http://example tag:")
+    assert terms == ["http", "example", "tag"]
+    assert filters["tag"] == []
+
+
+def test_split_tags_accepts_commas_and_spaces():
+    assert split_tags(" A, b  c,,") == ["a", "b", "c"]
+
+
+def test_default_index_path_is_outside_the_notes_folder(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    notes = tmp_path / "notes"
+    path = default_index_path(str(notes))
+    assert not os.path.abspath(path).startswith(os.path.abspath(notes) + os.sep)
+    assert path == default_index_path(str(notes))
+    assert path != default_index_path(str(tmp_path / "other"))
+
+
+@pytest.fixture
+def index(tmp_path):
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    (notes / "2025-06-01_Alpha_python.txt").write_text("Title: Alpha\n\nParsing python python code", encoding="utf-8")
+    (notes / "2025-07-01_Beta_python,cli.txt").write_text("A python command line tool", encoding="utf-8")
+    (notes / "2025-08-01_Gamma.txt").write_text("Nothing relevant", encoding="utf-8")
+    (notes / ".hidden.txt").write_text("python", encoding="utf-8")
+    return NoteIndex(str(notes), str(tmp_path / "index.sqlite3"))
+
+
+def titles(results):
+    return [result.title for result in results]
+
+
+def test_search_ranks_keywords_and_applies_filters(index):
+    assert index.update() == 3
+    assert titles(index.search("python")) == ["Alpha", "Beta"]
+    assert titles(index.search("python tag:cli")) == ["Beta"]
+    assert titles(index.search("", after="2025-07-01")) == ["Gamma", "Beta"]
+    assert titles(index.search("date:2025-06")) == ["Alpha"]
+    assert titles(index.search("", limit=None)) == ["Gamma", "Beta", "Alpha"]
+    assert index.search("missing") == []
+
+
+def test_update_only_reindexes_changed_and_deleted_notes(index):
+    index.update()
+    assert index.update() == 0
+    path = os.path.join(index.notes_dir, "2025-08-01_Gamma.txt")
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(" now about python")
+    os.remove(os.path.join(index.notes_dir, "2025-06-01_Alpha_python.txt"))
+    assert index.update() == 2
+    # Tags count as terms, so Beta's "python" tag ranks it first
+    assert titles(index.search("python")) == ["Beta", "Gamma"]
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+import notebook
+from note_index import parse_note
+from note_store import NOTES_DIR, NoteStore, note_filename, note_header, parse_tags, slugify
+
+
+def test_default_notes_folder_does_not_depend_on_the_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert os.path.isabs(NOTES_DIR)
+    assert os.path.dirname(NOTES_DIR) == os.path.dirname(os.path.abspath(notebook.__file__))
+    assert notebook.build_parser().parse_args(["list"]).dir == NOTES_DIR
+
+
+def test_note_filename_format():
+    assert note_filename("Project Ideas", ["Python", "Home Lab"], "2025-06-01") == \
+        "2025-06-01_Project-Ideas_python,home-lab.txt"
+    assert note_filename("Plain", [], "2025-06-01") == "2025-06-01_Plain.txt"
+
+
+def test_slugify_never_produces_field_separators():
+    assert slugify("snake_case tips") == "snake-case-tips"
+    assert slugify("  __ ") == "note"
+    assert note_filename("a_b", ["c_d"], "2025-06-01") == "2025-06-01_a-b_c-d.txt"
+
+
+def test_header_tags_win_over_filename():
+    title, tags, date = "snake_case tips", [], "2025-06-01"
+    filename = note_filename(title, tags, date)
+    assert parse_note(filename, note_header(title, tags, date), 0) == (title, date, [])
+    assert "Tags:" in note_header(title, tags, date)
+
+
+def test_parse_tags():
+    assert parse_tags(" a, ,b ") == ["a", "b"]
+    assert parse_tags(["x ", ""]) == ["x"]
+    assert parse_tags(None) == []
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    return NoteStore(str(tmp_path / "notes"))
+
+
+def test_create_allocates_unique_names(store):
+    first = store.create("Same", "one", date="2025-06-01")
+    second = store.create("Same", "two", date="2025-06-01")
+    assert os.path.basename(first) == "2025-06-01_Same.txt"
+    assert os.path.basename(second) == "2025-06-01_Same-2.txt"
+    with open(second, encoding="utf-8") as file:
+        assert file.read().endswith("\n\ntwo")
+
+
+def test_bulk_create_avoids_existing_and_duplicate_names(store):
+    store.create("Same", date="2025-06-01")
+    paths = store.bulk_create([("Same", "a", "", "2025-06-01"), ("Same", "b", "x", "2025-06-01"),
+                               ("Same", "c", "", "2025-06-01")], workers=2, batch_size=1)
+    assert [os.path.basename(path) for path in paths] == [
+        "2025-06-01_Same-2.txt", "2025-06-01_Same_x.txt", "2025-06-01_Same-3.txt"]
+
+
+def test_find_append_list_and_search(store):
+    path = store.create("snake_case tips", "use underscores", date="2025-06-01")
+    store.create("Other", "tagged", tags="work", date="2025-06-02")
+    assert store.find("SNAKE_CASE TIPS") == path
+    assert store.append("snake_case tips", "more") == path
+    with open(path, encoding="utf-8") as file:
+        assert file.read().endswith("use underscores\nmore")
+    assert [note.title for note in store.list()] == ["Other", "snake_case tips"]
+    assert [note.tags for note in store.list()] == [["work"], []]
+    assert [note.title for note in store.list("work")] == ["Other"]
+    assert [note.path for note in store.search("underscores")] == [path]
+    with pytest.raises(FileNotFoundError):
+        store.find("missing")
+
+
+def test_import_files_titles_notes_after_files(store, tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "first.txt").write_text("one", encoding="utf-8")
+    (source / "skip.md").write_text("no", encoding="utf-8")
+    paths = store.import_files([str(source)], tags="imported")
+    assert len(paths) == 1
+    assert [(note.title, note.tags) for note in store.list()] == [("first", ["imported"])]
@@ -0,0 +1,45 @@
+import pytest
+
+from pdf_export import export_pdf, find_unicode_font, wrap_line
+
+
+def char_count(text):
+    return float(len(text))
+
+
+def test_line_that_fits_is_returned_whole():
+    assert wrap_line("short line", 20, char_count) == ["short line"]
+    assert wrap_line("", 20, char_count) == [""]
+
+
+def test_long_line_breaks_at_spaces():
+    pieces = wrap_line("the quick brown fox jumps over the lazy dog", 10, char_count)
+    assert pieces == ["the quick", "brown fox", "jumps over", "the lazy", "dog"]
+    assert all(len(piece) <= 10 for piece in pieces)
+
+
+def test_word_wider_than_the_page_is_split():
+    pieces = wrap_line("ab " + "x" * 25 + " cd", 10, char_count)
+    assert pieces == ["ab", "x" * 10, "x" * 10, "x" * 5 + " cd"]
+
+
+def test_each_piece_holds_at_least_one_character():
+    assert wrap_line("abc de", 0.5, char_count) == ["a", "b", "c", "d", "e"]
+
+
+def test_wide_characters_are_measured_by_width():
+    def width(text):
+        return sum(2.0 if char == "W" else 1.0 for char in text)
+
+    assert wrap_line("WWWiii", 4, width) == ["WW", "Wii", "i"]
+
+
+def test_export_writes_a_pdf(tmp_path):
+    pytest.importorskip("fpdf")
+    source = tmp_path / "note.txt"
+    source.write_text("Title: Test\n\n" + "word " * 200 + "\n\tTabbed ünïcödé\n" + "x" * 500, encoding="utf-8")
+    output = tmp_path / "note.pdf"
+    progress = []
+    export_pdf(str(source), str(output), find_unicode_font(), progress=lambda done, total: progress.append(done))
+    assert output.read_bytes().startswith(b"%PDF")
+    assert progress[-1] == source.stat().st_size
@@ -0,0 +1,69 @@
+import re
+
+import pytest
+
+from text_search import compile_pattern, iter_match_batches
+
+
+def utf16_offset(text, index):
+    return len(text[:index].encode("utf-16-le")) // 2
+
+
+def all_matches(text, pattern, batch_size=100):
+    starts, ends = [], []
+    for batch_starts, batch_ends in iter_match_batches(text, pattern, batch_size):
+        starts += batch_starts
+        ends += batch_ends
+    return starts, ends
+
+
+def test_plain_text_positions_are_string_indexes():
+    assert all_matches("cat scat Cat", compile_pattern("cat")) == ([0, 5, 9], [3, 8, 12])
+
+
+def test_case_sensitive_and_regex_options():
+    assert all_matches("cat Cat", compile_pattern("Cat", case_sensitive=True)) == ([4], [7])
+    assert all_matches("a1 b22", compile_pattern(r"\d+", regex=True)) == ([1, 4], [2, 6])
+    assert all_matches("a.b", compile_pattern(".", regex=False)) == ([1], [2])
+
+
+def test_invalid_regex_raises():
+    with pytest.raises(re.error):
+        compile_pattern("(", regex=True)
+
+
+def test_bmp_characters_do_not_shift_positions():
+    assert all_matches("éé cat ü cat", compile_pattern("cat")) == ([3, 9], [6, 12])
+
+
+def test_emoji_before_and_between_matches_shift_by_utf16_units():
+    text = "\U0001F600 cat \U0001F680\U0001F680 cat"
+    starts, ends = all_matches(text, compile_pattern("cat"))
+    expected = [match.span() for match in re.finditer("cat", text)]
+    assert starts == [utf16_offset(text, start) for start, _ in expected] == [3, 12]
+    assert ends == [utf16_offset(text, end) for _, end in expected] == [6, 15]
+
+
+def test_matches_containing_emoji_span_both_code_units():
+    text = "a\U0001F600b"
+    assert all_matches(text, compile_pattern("\U0001F600b")) == ([1], [4])
+
+
+def test_empty_matches_are_skipped():
+    pattern = compile_pattern("x*", regex=True)
+    assert all_matches("axxbx", pattern) == ([1, 4], [3, 5])
+    assert all_matches("abc", pattern) == ([], [])
+    assert all_matches("", compile_pattern("^", regex=True)) == ([], [])
+
+
+def test_batches_split_at_the_batch_size():
+    text = "ab " * 7
+    batches = list(iter_match_batches(text, compile_pattern("ab"), batch_size=3))
+    assert [len(starts) for starts, _ in batches] == [3, 3, 1]
+    assert [start for starts, _ in batches for start in starts] == [0, 3, 6, 9, 12, 15, 18]
+
+
+def test_exact_multiple_of_the_batch_size_yields_no_empty_batch():
+    batches = list(iter_match_batches("ab " * 6, compile_pattern("ab"), batch_size=3))
+    assert [len(starts) for starts, _ in batches] == [3, 3]
+    assert list(iter_match_batches("none here", compile_pattern("ab"))) == []